@@ -1,22 +1,18 @@
 import streamlit as st
+import importlib.util
 import os
+from datetime import date
 from src.utils.descriptions import SOLUTION_DESCRIPTION, SOLUTION_NAME
 from src.utils.logger import MeuLogger
+from src.utils.trabalhos import CANCELADO, CONCLUIDO, GerenciadorTrabalhos
 
-# Try to import modules that may require Selenium. If Selenium (or other
-# runtime-only dependencies) are missing in the deployment environment,
-# catch the error and show a friendly message in the UI instead of crashing.
-try:
-    from src.utils.extract_pbi import ExtratorPBI
-    from src.utils.extract_pentaho import ExtratorPentaho
-    selenium_available = True
-    selenium_import_error = None
-except Exception as e:
-    ExtratorPBI = None
-    ExtratorPentaho = None
-    selenium_available = False
-    selenium_import_error = e
-
+# Check (without importing) for modules that may be missing in the deployment
+# environment, such as Selenium, and show a friendly message in the UI instead
+# of crashing. The extractors (pandas, requests, selenium) are imported lazily,
+# only when an option runs, so every rerun of this script stays cheap.
+modulos_ausentes = [modulo for modulo in ("selenium", "pandas", "requests") if importlib.util.find_spec(modulo) is None]
+selenium_available = not modulos_ausentes
+selenium_import_error = f"Módulos não encontrados: {', '.join(modulos_ausentes)}" if modulos_ausentes else None
 
 
 project_root = os.getcwd()
@@ -24,6 +20,84 @@ project_root = os.getcwd()
 
 logger = MeuLogger.setup_logger(log_folder=project_root + "/logs")
 
+
+@st.cache_resource
+def gerenciador_trabalhos() -> GerenciadorTrabalhos:
+    """Trabalhos em segundo plano compartilhados por todas as sessões do app"""
+    return GerenciadorTrabalhos(logger)
+
+
+@st.cache_resource
+def extrator_pbi():
+    """Extrator do Power BI (payloads, sessão HTTP e cache) criado uma única vez por processo"""
+    from src.utils.extract_pbi import ExtratorPBI
+
+    return ExtratorPBI(logger)
+
+
+@st.cache_data(ttl=600, show_spinner="Consultando data de atualização...")
+def data_atualizacao_pbi():
+    """Data de atualização do relatório, compartilhada entre sessões por 10 minutos"""
+    return extrator_pbi().data_atualizacao()
+
+
+def extrair_igr(trabalho, extrator, data_atualizacao):
+    """Extrai a grade de IGR informando o progresso; o cancelamento interrompe o gerador"""
+    from src.utils.esquemas import concatenar
+
+    dfs = []
+    for df in extrator.iter_igr(
+        data_atualizacao=data_atualizacao, ordenado=True, progresso=trabalho.atualizar, cancelar=trabalho.cancelar
+    ):
+        if trabalho.cancelar.is_set():
+            break  # Fechar o gerador descarta as requisições ainda não iniciadas
+        dfs.append(df)
+    return concatenar(dfs) if dfs else None
+
+
+def extrair_pentaho(trabalho, operadoras):
+    """Extrai as vidas das operadoras informando o progresso por bloco"""
+    from src.utils.extract_pentaho import ExtratorPentaho
+
+    return ExtratorPentaho(logger, headless=True).df_vidas_operadora(
+        operadoras, progresso=trabalho.atualizar, cancelar=trabalho.cancelar
+    )
+
+
+def exibir_trabalho(chave):
+    """Estado do trabalho: progresso enquanto executa, resultado ao concluir"""
+    trabalho = gerenciador_trabalhos().obter(chave)
+    if trabalho is None:
+        return
+
+    if trabalho.ativo:
+        acompanhar_trabalho(chave)
+    elif trabalho.status == CONCLUIDO:
+        st.success(f"{trabalho.descricao}: concluído em {trabalho.duracao:.0f}s ({trabalho.linhas} linhas)")
+        st.write(trabalho.resultado)
+    elif trabalho.status == CANCELADO:
+        st.warning(f"{trabalho.descricao}: cancelado ({trabalho.concluidas}/{trabalho.total} concluídas)")
+    else:
+        st.error(f"{trabalho.descricao}: {trabalho.erro}")
+
+
+@st.fragment(run_every=1)
+def acompanhar_trabalho(chave):
+    """Atualiza o progresso a cada segundo sem reexecutar o restante da página"""
+    trabalho = gerenciador_trabalhos().obter(chave)
+    if trabalho is None or not trabalho.ativo:
+        st.rerun()  # Terminou: a página inteira exibe o resultado
+
+    if trabalho.cancelar.is_set():
+        texto = f"{trabalho.descricao}: cancelando..."
+    elif trabalho.total:
+        texto = f"{trabalho.descricao}: {trabalho.concluidas}/{trabalho.total} concluídas"
+    else:
+        texto = f"{trabalho.descricao}: iniciando..."
+    st.progress(trabalho.fracao, text=texto)
+    st.caption(f"{trabalho.linhas} linhas até agora - {trabalho.duracao:.0f}s")
+
+
 st.set_page_config(page_title=SOLUTION_NAME)
 
 st.title(SOLUTION_NAME)
@@ -60,6 +134,11 @@ menu_options = [
 
 option = st.selectbox("Selecione uma opção:", menu_options)
 
+operadoras = []
+if option == menu_options[2]:
+    codigos = st.text_input("Códigos de Registro ANS (separados por vírgula):", "368253")
+    operadoras = [codigo.strip() for codigo in codigos.split(",") if codigo.strip()]
+
 col1, col2 = st.columns(2)
 with col1:
     if st.button("Executar"):
@@ -68,17 +147,42 @@ with col1:
                 "Execução bloqueada: dependências necessárias (Selenium) não estão instaladas. "
                 "Adicione `requirements.txt` e redeploy ou execute localmente com `pip install -r requirements.txt`."
             )
-        else:
-            if option == menu_options[0]:
-                res = ExtratorPBI(logger).data_atualizacao()
-                st.write(res)
-            elif option == menu_options[1]:
-                res = ExtratorPBI(logger).dados_IGR()
-                st.write(res)
-            elif option == menu_options[2]:
-                res = ExtratorPentaho(logger).df_vidas_operadora(["368253"])
-                st.write(res)
+        elif option == menu_options[0]:
+            res = data_atualizacao_pbi()
+            if res is None:
+                data_atualizacao_pbi.clear()  # Não mantém a falha em cache
+            st.write(res)
+        elif option == menu_options[1]:
+            data_atualizacao = data_atualizacao_pbi()
+            if data_atualizacao is None:
+                data_atualizacao_pbi.clear()
+                st.error("Não foi possível obter a data de atualização do Power BI.")
+            else:
+                # Mesma data de atualização = mesmo resultado: sessões simultâneas compartilham a extração
+                extrator = extrator_pbi()
+                chave = ("IGR", data_atualizacao)
+                gerenciador_trabalhos().iniciar(
+                    chave,
+                    f"IGR ({data_atualizacao})",
+                    lambda trabalho: extrair_igr(trabalho, extrator, data_atualizacao),
+                )
+                st.session_state["trabalho"] = chave
+        elif option == menu_options[2]:
+            if not operadoras:
+                st.error("Informe ao menos um código de operadora.")
+            else:
+                # O Pentaho não informa data de atualização: resultado reaproveitado no mesmo dia
+                chave = ("Pentaho", date.today().isoformat(), tuple(operadoras))
+                gerenciador_trabalhos().iniciar(
+                    chave,
+                    f"Pentaho ({len(operadoras)} operadoras)",
+                    lambda trabalho: extrair_pentaho(trabalho, operadoras),
+                )
+                st.session_state["trabalho"] = chave
 
 with col2:
-    if st.button("Parar Execução"):
-        st.stop()  # encerra a execução
+    if st.button("Parar Execução") and "trabalho" in st.session_state:
+        gerenciador_trabalhos().cancelar(st.session_state["trabalho"])
+
+if "trabalho" in st.session_state:
+    exibir_trabalho(st.session_state["trabalho"])
@@ -0,0 +1,3 @@
+"""
+Benchmarks offline da extração (sem acesso ao relatório da ANS)
+"""
@@ -0,0 +1,194 @@
+"""
+Benchmark offline da extração do Power BI contra o servidor querydata local
+
+Mede:
+* gerar_payload_igr: payloads/s
+* tratamento_dos_dados: linhas decodificadas/s
+* extrair: requisições/s e latência p50/p95
+* extrair_dados("IGR"): tempo total da grade completa
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_extracao --saida bench_resultados.json
+    python -m benchmarks.bench_extracao --comparar bench_anterior.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.servidor_querydata import ServidorQueryData, gerar_dsr
+from src.utils.extract_pbi import ExtratorPBI, FalhaExtracao
+from src.utils.limitador import LimitadorAdaptativo
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def pico_memoria_mb() -> float | None:
+    """Pico de memória residente (RSS) do processo, em MB"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def bench_payload(extrator: ExtratorPBI, iteracoes: int) -> dict:
+    inicio = time.perf_counter()
+    for i in range(iteracoes):
+        extrator.gerar_payload_igr("Médico-hospitalar", "jan", str(2000 + i % 30), "Grande Porte")
+    duracao = time.perf_counter() - inicio
+    return {"iteracoes": iteracoes, "segundos": round(duracao, 4), "payloads_s": round(iteracoes / duracao, 1)}
+
+
+def bench_decodificacao(extrator: ExtratorPBI, linhas: int, repeticoes: int) -> dict:
+    data = {"results": [gerar_dsr(0, linhas, linhas)]}
+    extrator.tratamento_dos_dados(data)  # Aquecimento: pandas é importado na primeira decodificação
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        df = extrator.tratamento_dos_dados(data)
+    duracao = time.perf_counter() - inicio
+    return {
+        "linhas": len(df),
+        "repeticoes": repeticoes,
+        "segundos": round(duracao, 4),
+        "linhas_s": round(linhas * repeticoes / duracao, 1),
+    }
+
+
+def bench_requisicoes(extrator: ExtratorPBI, requisicoes: int) -> dict:
+    payload = extrator.gerar_payload_igr("Médico-hospitalar", "jan", "2025", "Grande Porte")
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        t = time.perf_counter()
+        extrator.extrair(payload, usar_cache=False)
+        latencias.append(time.perf_counter() - t)
+    duracao = time.perf_counter() - inicio
+    return {
+        "requisicoes": requisicoes,
+        "requisicoes_s": round(requisicoes / duracao, 2),
+        "latencia_p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "latencia_p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "conexoes": extrator.sessao.estatisticas(),
+    }
+
+
+def bench_grade(extrator: ExtratorPBI, servidor: ServidorQueryData) -> dict:
+    requisicoes_antes = servidor.requisicoes
+    inicio = time.perf_counter()
+    falha = None
+    try:
+        df = extrator.extrair_dados("IGR")
+    except FalhaExtracao as e:  # Ex: --taxa-erro alta ou --sem-limitador: a grade não é entregue incompleta
+        df, falha = None, str(e)
+    duracao = time.perf_counter() - inicio
+    linhas = 0 if df is None else len(df)
+    return {
+        "segundos": round(duracao, 3),
+        "linhas": linhas,
+        "falha": falha,
+        "linhas_s": round(linhas / duracao, 1),
+        "requisicoes_http": servidor.requisicoes - requisicoes_antes,
+        "respostas_429": servidor.limitadas,
+        "limitador": None if extrator.sessao.limitador is None else extrator.sessao.limitador.estatisticas(),
+    }
+
+
+def executar(args) -> dict:
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.WARNING if not args.verboso else logging.INFO)
+
+    resultados = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": vars(args).copy(),
+    }
+
+    # As dimensões sintéticas usam a mesma data de atualização do relatório real: ficam fora de cache/
+    with tempfile.TemporaryDirectory(prefix="bench_extracao_") as temporario, ServidorQueryData(
+        linhas=args.linhas, latencia_ms=args.latencia_ms, taxa_erro=args.taxa_erro, max_simultaneas=args.max_simultaneas
+    ) as servidor:
+        extrator = ExtratorPBI(
+            logger,
+            max_workers=args.max_workers,
+            tamanho_pagina=args.tamanho_pagina,
+            tamanho_lote=args.tamanho_lote,
+            usar_cache=False,
+            url=servidor.url,
+            caminho_dimensoes=Path(temporario) / "dimensoes_igr.json",
+            limitador=None if args.sem_limitador else LimitadorAdaptativo(),
+        )
+        resultados["gerar_payload_igr"] = bench_payload(extrator, args.iteracoes)
+        resultados["tratamento_dos_dados"] = bench_decodificacao(extrator, args.linhas, args.repeticoes)
+        resultados["extrair"] = bench_requisicoes(extrator, args.requisicoes)
+        resultados["extrair_dados_igr"] = bench_grade(extrator, servidor)
+
+    resultados["pico_rss_mb"] = pico_memoria_mb()
+    return resultados
+
+
+def comparar(atual: dict, anterior: dict):
+    """Imprime a variação das métricas principais em relação a um resultado anterior"""
+    metricas = [
+        ("gerar_payload_igr", "payloads_s"),
+        ("tratamento_dos_dados", "linhas_s"),
+        ("extrair", "requisicoes_s"),
+        ("extrair", "latencia_p95_ms"),
+        ("extrair_dados_igr", "segundos"),
+        ("extrair_dados_igr", "requisicoes_http"),
+    ]
+    print(f"{'métrica':<45}{'anterior':>14}{'atual':>14}{'variação':>12}")
+    for secao, nome in metricas:
+        antes = anterior.get(secao, {}).get(nome)
+        depois = atual.get(secao, {}).get(nome)
+        variacao = f"{(depois - antes) / antes:+.1%}" if antes and depois is not None else "-"
+        print(f"{secao + '.' + nome:<45}{str(antes):>14}{str(depois):>14}{variacao:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline da extração Power BI")
+    parser.add_argument("--linhas", type=int, default=800, help="Linhas por consulta no servidor local")
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--max-simultaneas", type=int, default=0, help="Limite do servidor local (HTTP 429 acima)")
+    parser.add_argument("--sem-limitador", action="store_true", help="Desativa o limitador adaptativo")
+    parser.add_argument("--tamanho-pagina", type=int, default=500)
+    parser.add_argument("--tamanho-lote", type=int, default=1)
+    parser.add_argument("--iteracoes", type=int, default=5000, help="Payloads gerados no bench de payload")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Decodificações no bench de DSR")
+    parser.add_argument("--requisicoes", type=int, default=30, help="Requisições sequenciais no bench de extrair")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="Resultado JSON anterior para comparação")
+    parser.add_argument("--verboso", action="store_true")
+    args = parser.parse_args()
+
+    resultados = executar(args)
+    texto = json.dumps(resultados, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(resultados, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
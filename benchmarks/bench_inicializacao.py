@@ -0,0 +1,144 @@
+"""
+Benchmark do tempo de inicialização (imports) do CLI, da consulta de data do Power BI e do app Streamlit
+
+Executa cada cenário em um interpretador novo com `python -X importtime`, soma o tempo dos
+imports disparados pelo cenário (descontando os da inicialização do próprio Python) e falha
+se algum cenário passar do orçamento ou importar um módulo pesado que deveria ser tardio.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_inicializacao
+    python -m benchmarks.bench_inicializacao --orcamento data_pbi=0.3 --saida inicializacao.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+CENARIOS = {
+    "cli": {
+        "codigo": "import main",
+        "orcamento": 0.25,
+        "proibidos": ["pandas", "numpy", "requests", "selenium", "schedule", "dotenv"],
+    },
+    "data_pbi": {
+        "codigo": "from src.utils.extract_pbi import ExtratorPBI",
+        "orcamento": 0.5,
+        "proibidos": ["pandas", "numpy", "pyarrow", "selenium"],
+    },
+    "app": {
+        "codigo": "import app",
+        "orcamento": 1.0,
+        "proibidos": ["pandas", "numpy", "pyarrow", "requests", "selenium"],
+    },
+}
+"""Código de cada cenário, orçamento (s) de imports e módulos que não podem ser carregados"""
+
+
+def medir_imports(codigo: str) -> tuple[dict[str, float], dict[str, float], set[str], float]:
+    """
+    Executa `codigo` em um interpretador novo com -X importtime
+
+    Returns:
+        (tempo acumulado (s) dos módulos de primeiro nível, tempo acumulado (s) dos módulos importados
+        diretamente por eles, todos os módulos carregados, duração do processo (s))
+    """
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        check=False,
+    )
+    duracao = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao executar {codigo!r}:\n{processo.stderr[-2000:]}")
+
+    topo = {}
+    filhos = {}
+    carregados = set()
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:") :].split("|", 2)
+        # O recuo do nome (2 espaços por nível) indica quem importou; aninhados já estão no acumulado do pai
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        nome = nome.strip()
+        carregados.add(nome)
+        if nivel == 0:
+            topo[nome] = int(acumulado) / 1e6
+        elif nivel == 1:
+            filhos[nome] = int(acumulado) / 1e6
+    return topo, filhos, carregados, duracao
+
+
+def executar_cenario(nome: str, cenario: dict, repeticoes: int, base: set[str]) -> dict:
+    """Mede o cenário `repeticoes` vezes e retorna a melhor medição (menos ruído de disco/CPU)"""
+    melhor = None
+    for _ in range(repeticoes):
+        topo, filhos, carregados, duracao = medir_imports(cenario["codigo"])
+        topo = {modulo: tempo for modulo, tempo in topo.items() if modulo not in base}
+        total = sum(topo.values())
+        if melhor is None or total < melhor["imports_s"]:
+            pesados = sorted({**topo, **filhos}.items(), key=lambda item: -item[1])
+            melhor = {
+                "imports_s": round(total, 4),
+                "processo_s": round(duracao, 4),
+                "mais_pesados": {modulo: round(tempo, 4) for modulo, tempo in pesados[:6]},
+                "proibidos_carregados": sorted(
+                    proibido
+                    for proibido in cenario["proibidos"]
+                    if any(modulo == proibido or modulo.startswith(proibido + ".") for modulo in carregados)
+                ),
+            }
+
+    melhor["orcamento_s"] = cenario["orcamento"]
+    melhor["ok"] = melhor["imports_s"] <= cenario["orcamento"] and not melhor["proibidos_carregados"]
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de inicialização (python -X importtime)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Execuções por cenário (vale a mais rápida)")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument(
+        "--orcamento", nargs="+", default=[], metavar="CENARIO=SEGUNDOS", help="Substitui o orçamento de um cenário"
+    )
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    cenarios = {nome: dict(CENARIOS[nome]) for nome in args.cenarios}
+    for item in args.orcamento:
+        nome, _, segundos = item.partition("=")
+        cenarios[nome]["orcamento"] = float(segundos)
+
+    # Imports da inicialização do interpretador (site, encodings...) não contam para os cenários
+    base = medir_imports("pass")[2]
+
+    resultados = {nome: executar_cenario(nome, cenario, args.repeticoes, base) for nome, cenario in cenarios.items()}
+    texto = json.dumps(resultados, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+    falhas = [nome for nome, resultado in resultados.items() if not resultado["ok"]]
+    for nome in falhas:
+        resultado = resultados[nome]
+        print(
+            f"❌ {nome}: {resultado['imports_s']}s de imports (orçamento {resultado['orcamento_s']}s), "
+            f"proibidos carregados: {resultado['proibidos_carregados'] or 'nenhum'}",
+            file=sys.stderr,
+        )
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Servidor HTTP local que imita o endpoint querydata do Power BI
+
+Responde cada consulta do array `queries` com um DSR sintético (ou gravado), com latência,
+taxa de erro e quantidade de linhas configuráveis. Suporta paginação por RestartTokens
+respeitando o `Window.Count` do payload e pode limitar requisições simultâneas (HTTP 429
+com Retry-After), como um endpoint com throttling.
+
+Uso:
+    python -m benchmarks.servidor_querydata --porta 8765 --linhas 800 --latencia-ms 80 --taxa-erro 0.02
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def gerar_dsr(inicio: int, quantidade: int, total: int, semente: int = 0) -> dict:
+    """
+    Gera um resultado DSR sintético no formato do payload IGR (1 dimensão + 5 medidas)
+
+    Usa as mesmas compactações do Power BI: índices em `ValueDicts`, repetição (`R`) e nulos (`Ø`).
+
+    Args:
+        inicio: Índice da primeira linha (paginação)
+        quantidade: Linhas desta página
+        total: Total de linhas do resultado
+        semente: Semente para valores reprodutíveis
+
+    Returns:
+        dict do item de `results`
+    """
+    aleatorio = random.Random(semente * 1_000_003 + inicio)
+    fim = min(inicio + quantidade, total)
+    schema = [
+        {"N": "G0", "T": 1, "DN": "D0"},
+        {"N": "M0", "T": 3},
+        {"N": "M1", "T": 4},
+        {"N": "M2", "T": 3},
+        {"N": "M3", "T": 4},
+        {"N": "M4", "T": 4},
+    ]
+
+    linhas = []
+    anterior = None
+    for i in range(inicio, fim):
+        valores = [
+            i - inicio,
+            f"{aleatorio.uniform(0, 50):.4f}",
+            aleatorio.randint(100, 500_000),
+            round(aleatorio.uniform(0, 100), 6),
+            i + 1,
+            aleatorio.randint(1, 1000),
+        ]
+        linha: dict = {}
+        if i == inicio:
+            linha["S"] = schema
+
+        repeticao = 0
+        nulos = 0
+        c = []
+        for j, valor in enumerate(valores):
+            if j == 1 and aleatorio.random() < 0.05:
+                nulos |= 1 << j
+            elif anterior is not None and j == 2 and aleatorio.random() < 0.2:
+                repeticao |= 1 << j
+                valores[j] = anterior[j]
+            else:
+                c.append(valor)
+        linha["C"] = c
+        if repeticao:
+            linha["R"] = repeticao
+        if nulos:
+            linha["Ø"] = nulos
+        linhas.append(linha)
+        anterior = valores
+
+    dataset = {
+        "N": "DS0",
+        "PH": [{"DM0": linhas}],
+        "IC": fim >= total,
+        "ValueDicts": {"D0": [f"OPERADORA SINTÉTICA {k:06d}" for k in range(inicio, fim)]},
+    }
+    if fim < total:
+        dataset["RT"] = [[str(fim)]]
+    return {"jobId": "local", "result": {"data": {"dsr": {"Version": 2, "MinorVersion": 1, "DS": [dataset]}}}}
+
+
+def gerar_data_atualizacao(data: str = "08/01/2026") -> dict:
+    """Resultado DSR da consulta de data de atualização (payload_data.json)"""
+    dataset = {"N": "DS0", "PH": [{"DM0": [{"S": [{"N": "M0", "T": 1}], "M0": data}]}], "IC": True}
+    return {"jobId": "local", "result": {"data": {"dsr": {"Version": 2, "MinorVersion": 1, "DS": [dataset]}}}}
+
+
+def gerar_dimensoes(ate: tuple[int, int] = (2025, 12)) -> dict:
+    """
+    Resultado DSR da consulta de dimensões (payload_dimensoes.json)
+
+    Todas as combinações de porte e segmentação de abr/2019 até o mês `ate` (ano, mês 1-12).
+    """
+    meses = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+    portes = ["Grande Porte", "Médio Porte", "Pequeno Porte"]
+    segmentacoes = ["Médico-hospitalar", "Exclusivamente odontológica"]
+    schema = [
+        {"N": "G0", "T": 4},
+        {"N": "G1", "T": 1, "DN": "D0"},
+        {"N": "G2", "T": 1, "DN": "D1"},
+        {"N": "G3", "T": 1, "DN": "D2"},
+        {"N": "M0", "T": 4},
+    ]
+    linhas = []
+    for indice in range(2019 * 12 + 3, ate[0] * 12 + ate[1]):
+        for porte in range(len(portes)):
+            for segmentacao in range(len(segmentacoes)):
+                linha = {"C": [indice // 12, indice % 12, porte, segmentacao, 1000]}
+                if not linhas:
+                    linha["S"] = schema
+                linhas.append(linha)
+    dataset = {
+        "N": "DS0",
+        "PH": [{"DM0": linhas}],
+        "IC": True,
+        "ValueDicts": {"D0": meses, "D1": portes, "D2": segmentacoes},
+    }
+    return {"jobId": "local", "result": {"data": {"dsr": {"Version": 2, "MinorVersion": 1, "DS": [dataset]}}}}
+
+
+class ServidorQueryData:
+    """
+    Servidor querydata local executado em uma thread
+
+    Exemplo:
+        with ServidorQueryData(linhas=800, latencia_ms=50) as servidor:
+            ExtratorPBI(logger, url=servidor.url)
+    """
+
+    def __init__(
+        self,
+        porta: int = 0,
+        linhas: int = 500,
+        latencia_ms: float = 50,
+        jitter_ms: float = 10,
+        taxa_erro: float = 0.0,
+        gravacao: dict | None = None,
+        max_simultaneas: int = 0,
+        retry_after: int = 1,
+    ):
+        """
+        Args:
+            porta: Porta TCP (0 = porta livre escolhida pelo sistema)
+            linhas: Linhas por consulta no DSR sintético
+            latencia_ms: Latência média de cada resposta
+            jitter_ms: Variação aleatória (+/-) da latência
+            taxa_erro: Fração das requisições respondidas com HTTP 503
+            gravacao: Resposta gravada (JSON completo) a devolver no lugar do DSR sintético
+            max_simultaneas: Requisições simultâneas aceitas; as excedentes recebem HTTP 429 (0 = sem limite)
+            retry_after: Valor (s) do header Retry-After nas respostas 429
+        """
+        self.linhas = linhas
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_erro = taxa_erro
+        self.gravacao = gravacao
+        self.max_simultaneas = max_simultaneas
+        self.retry_after = retry_after
+        self.requisicoes = 0
+        self.limitadas = 0
+        self._simultaneas = 0
+        self._lock = threading.Lock()
+
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if servidor.entrar():
+                    try:
+                        status, resposta = servidor.responder(json.loads(corpo or b"{}"))
+                    finally:
+                        servidor.sair()
+                else:
+                    status, resposta = 429, {"error": "Too Many Requests"}
+                dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", str(servidor.retry_after))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}/public/reports/querydata?synchronous=true"
+
+    def entrar(self) -> bool:
+        """Reserva uma vaga de requisição simultânea; False se o limite foi atingido"""
+        with self._lock:
+            if self.max_simultaneas and self._simultaneas >= self.max_simultaneas:
+                self.limitadas += 1
+                return False
+            self._simultaneas += 1
+            return True
+
+    def sair(self):
+        with self._lock:
+            self._simultaneas -= 1
+
+    def responder(self, payload: dict) -> tuple[int, dict]:
+        """Monta a resposta (status, JSON) de um payload"""
+        with self._lock:
+            self.requisicoes += 1
+
+        latencia = max(0.0, self.latencia_ms + random.uniform(-self.jitter_ms, self.jitter_ms))
+        time.sleep(latencia / 1000)
+
+        if random.random() < self.taxa_erro:
+            return 503, {"error": "Service Unavailable"}
+        if self.gravacao is not None:
+            return 200, self.gravacao
+
+        resultados = []
+        for indice, consulta in enumerate(payload.get("queries", [])):
+            comando = consulta["Query"]["Commands"][0]["SemanticQueryDataShapeCommand"]
+            janela = comando["Binding"].get("DataReduction", {}).get("Primary", {}).get("Window")
+            if janela is None:
+                # Consulta sem janela (payload_data.json): medida única com a data de atualização
+                resultados.append(gerar_data_atualizacao())
+                continue
+            if any(item.get("Name") == "Porte.Porte" for item in comando["Query"]["Select"]):
+                # Consulta de dimensões (payload_dimensoes.json)
+                resultados.append(gerar_dimensoes())
+                continue
+            quantidade = int(janela.get("Count", self.linhas))
+            tokens = janela.get("RestartTokens")
+            inicio = int(tokens[0][0]) if tokens else 0
+            resultados.append(gerar_dsr(inicio, quantidade, self.linhas, semente=indice))
+        return 200, {"jobIds": ["local"], "results": resultados}
+
+    def iniciar(self) -> "ServidorQueryData":
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor querydata local para benchmarks")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--linhas", type=int, default=500)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--gravacao", help="Arquivo JSON com uma resposta gravada do querydata")
+    parser.add_argument("--max-simultaneas", type=int, default=0, help="Acima disso responde 429 (0 = sem limite)")
+    args = parser.parse_args()
+
+    gravacao = None
+    if args.gravacao:
+        with open(args.gravacao, "r", encoding="utf-8") as f:
+            gravacao = json.load(f)
+
+    servidor = ServidorQueryData(
+        args.porta, args.linhas, args.latencia_ms, args.jitter_ms, args.taxa_erro, gravacao, args.max_simultaneas
+    ).iniciar()
+    print(f"Servidor querydata local em {servidor.url} (Ctrl+C para encerrar)")
+    try:
+        servidor._thread.join()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Servidor HTTP local que imita a API REST do plugin Saiku do Pentaho
+
+Atende a descoberta de cubos, os metadados do cubo e a execução de MDX, devolvendo um
+cellset achatado sintético para os Registros filtrados na consulta (lista "|cod|cod|").
+
+Uso:
+    python -m benchmarks.servidor_saiku --porta 8766 --operadoras 500 --municipios 20
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CUBO = {
+    "uniqueName": "[Beneficiarios].[Beneficiarios].[Beneficiarios].[Beneficiarios por operadora]",
+    "name": "Beneficiarios por operadora",
+    "caption": "Beneficiarios por operadora",
+    "connection": "Beneficiarios",
+    "catalog": "Beneficiarios",
+    "schema": "Beneficiarios",
+    "visible": True,
+}
+
+MEDIDAS = ["Assistencia Medica", "Exclusivamente Odontologico"]
+
+METADADOS = {
+    "dimensions": [
+        {
+            "name": "Operadoras",
+            "caption": "Operadoras",
+            "hierarchies": [
+                {
+                    "uniqueName": "[Operadoras]",
+                    "levels": [
+                        {"name": "(All)", "caption": "(All)", "uniqueName": "[Operadoras].[(All)]"},
+                        {"name": "Registro", "caption": "Registro", "uniqueName": "[Operadoras].[Registro]"},
+                        {"name": "Razao Social", "caption": "Razao Social", "uniqueName": "[Operadoras].[Razao Social]"},
+                    ],
+                }
+            ],
+        },
+        {
+            "name": "Cobertura Assistencial",
+            "caption": "Cobertura Assistencial",
+            "hierarchies": [
+                {
+                    "uniqueName": "[Cobertura Assistencial]",
+                    "levels": [
+                        {
+                            "name": "Cobertura Assistencial",
+                            "caption": "Cobertura Assistencial",
+                            "uniqueName": "[Cobertura Assistencial].[Cobertura Assistencial]",
+                        }
+                    ],
+                }
+            ],
+        },
+        {
+            "name": "Area Residência do Beneficiario",
+            "caption": "Area Residência do Beneficiario",
+            "hierarchies": [
+                {
+                    "uniqueName": "[Area Residencia]",
+                    "levels": [
+                        {"name": "UF", "caption": "UF", "uniqueName": "[Area Residencia].[UF]"},
+                        {
+                            "name": "Nome  do municipio",
+                            "caption": "Nome  do municipio",
+                            "uniqueName": "[Area Residencia].[Nome  do municipio]",
+                        },
+                    ],
+                }
+            ],
+        },
+    ],
+    "measures": [{"name": nome, "caption": nome, "uniqueName": f"[Measures].[{nome}]"} for nome in MEDIDAS],
+}
+
+PADRAO_LISTA = re.compile(r'InStr\("\|([^"]*)\|"')
+
+
+def gerar_cellset(operadoras: list[str], conhecidas: set[str], municipios: int) -> dict:
+    """
+    Cellset achatado no formato do Saiku (cabeçalho + uma linha por operadora/cobertura/município)
+
+    Cabeçalhos de linha repetidos em relação à linha anterior são enviados como "null".
+    """
+    niveis = ["Registro", "Razao Social", "Cobertura Assistencial", "UF", "Nome  do municipio"]
+    cabecalho = [{"value": nivel, "type": "ROW_HEADER_HEADER", "properties": {}} for nivel in niveis]
+    cabecalho += [{"value": medida, "type": "COLUMN_HEADER", "properties": {}} for medida in MEDIDAS]
+
+    cellset = [cabecalho]
+    anterior = None
+    for codigo in operadoras:
+        if codigo not in conhecidas:
+            continue
+        aleatorio = random.Random(codigo)
+        for cobertura in ("Assistência Médica", "Odontológico"):
+            for m in range(municipios):
+                cabecalhos = [codigo, f"OPERADORA {codigo}", cobertura, f"UF{m % 27:02d}", f"MUNICIPIO {m:04d}"]
+                linha = [
+                    {
+                        "value": "null" if anterior is not None and anterior[: i + 1] == cabecalhos[: i + 1] else valor,
+                        "type": "ROW_HEADER",
+                        "properties": {},
+                    }
+                    for i, valor in enumerate(cabecalhos)
+                ]
+                for _ in MEDIDAS:
+                    valor = aleatorio.randint(0, 50_000)
+                    linha.append(
+                        {"value": f"{valor:,}".replace(",", "."), "type": "DATA_CELL", "properties": {"raw": str(valor)}}
+                    )
+                cellset.append(linha)
+                anterior = cabecalhos
+
+    return {
+        "cellset": cellset,
+        "topOffset": 1,
+        "leftOffset": len(niveis),
+        "height": len(cellset),
+        "width": len(cabecalho),
+        "runtime": 0,
+        "error": None,
+    }
+
+
+class ServidorSaiku:
+    """
+    Servidor Saiku local executado em uma thread
+
+    Exemplo:
+        with ServidorSaiku(operadoras=100) as servidor:
+            ExtratorPentahoRest(logger, url=servidor.url).df_vidas_operadora(["100000"])
+    """
+
+    def __init__(self, porta: int = 0, operadoras: int = 100, municipios: int = 10, latencia_ms: float = 20):
+        """
+        Args:
+            porta: Porta TCP (0 = porta livre escolhida pelo sistema)
+            operadoras: Quantidade de Registros existentes (códigos 100000, 100001, ...)
+            municipios: Municípios por operadora e cobertura no resultado
+            latencia_ms: Latência de cada resposta
+        """
+        self.conhecidas = {str(100000 + i) for i in range(operadoras)}
+        self.municipios = municipios
+        self.latencia_ms = latencia_ms
+        self.consultas: list[str] = []
+        self._lock = threading.Lock()
+
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _responder(self, status: int, resposta):
+                dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                time.sleep(servidor.latencia_ms / 1000)
+                caminho = self.path.split("?")[0].rstrip("/")
+                if caminho.endswith("/metadata"):
+                    self._responder(200, METADADOS)
+                elif caminho.endswith("/discover"):
+                    esquema = {"name": CUBO["schema"], "cubes": [CUBO]}
+                    catalogo = {"name": CUBO["catalog"], "schemas": [esquema]}
+                    self._responder(200, [{"name": CUBO["connection"], "catalogs": [catalogo]}])
+                else:
+                    self._responder(404, {"error": "not found"})
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.split("?")[0].endswith("/api/query/execute"):
+                    self._responder(404, {"error": "not found"})
+                    return
+                self._responder(200, servidor.executar(json.loads(corpo or b"{}").get("mdx", "")))
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}/pentaho/plugin/saiku/api"
+
+    def executar(self, mdx: str) -> dict:
+        """Resultado de uma consulta MDX (apenas o filtro de Registro é interpretado)"""
+        with self._lock:
+            self.consultas.append(mdx)
+        time.sleep(self.latencia_ms / 1000)
+
+        encontrado = PADRAO_LISTA.search(mdx)
+        if encontrado is None:
+            return {"cellset": None, "error": "Filtro de Registro ausente no MDX"}
+        return gerar_cellset(encontrado.group(1).split("|"), self.conhecidas, self.municipios)
+
+    def iniciar(self) -> "ServidorSaiku":
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Saiku local para benchmarks")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--operadoras", type=int, default=100)
+    parser.add_argument("--municipios", type=int, default=10)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    servidor = ServidorSaiku(args.porta, args.operadoras, args.municipios, args.latencia_ms).iniciar()
+    print(f"Servidor Saiku local em {servidor.url} (Ctrl+C para encerrar)")
+    try:
+        servidor._thread.join()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
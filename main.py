@@ -6,13 +6,34 @@ import sys
 from typing import Callable, TypedDict
 
 from src.utils.descriptions import SOLUTION_DESCRIPTION, SOLUTION_NAME
-from src.utils.extract_pbi import ExtratorPBI as extrator_pbi
-from src.utils.extract_pentaho import df_vidas_operadora
 from src.utils.logger import MeuLogger
-from start_sync_service import start_sync_service
 
 # Configura logger
-logger = MeuLogger.setup_logger()
+logger = MeuLogger.setup_logger("logs")
+
+# Extratores e agendador (pandas, requests, selenium) são importados apenas quando a opção é executada:
+# o menu abre sem carregá-los e a consulta de data não paga o custo do Selenium
+
+
+def sincronizacao_agendada():
+    """Inicia o serviço de sincronização agendada"""
+    from start_sync_service import start_sync_service
+
+    start_sync_service()
+
+
+def extrator_pbi():
+    """Extrator do Power BI"""
+    from src.utils.extract_pbi import ExtratorPBI
+
+    return ExtratorPBI(logger)
+
+
+def extrator_pentaho():
+    """Extrator do Pentaho (Selenium)"""
+    from src.utils.extract_pentaho import ExtratorPentaho
+
+    return ExtratorPentaho(logger)
 
 
 class MenuOption(TypedDict):
@@ -44,19 +65,19 @@ def print_menu():
 MENU: list[MenuOption] = [
     {
         "title": "Iniciar serviço de sincronização automática (agendado)",
-        "exec": start_sync_service,
+        "exec": sincronizacao_agendada,
     },
     {
         "title": "Extrair Dados PBI - Data",
-        "exec": lambda: extrator_pbi(logger).data_atualizacao(),
+        "exec": lambda: extrator_pbi().data_atualizacao(),
     },
     {
         "title": "Extrair Dados PBI - IGR",
-        "exec": lambda: extrator_pbi(logger).dados_IGR(),
+        "exec": lambda: extrator_pbi().dados_IGR(),
     },
     {
         "title": "Extrair Dados Pentaho - Vidas Operadora",
-        "exec": lambda: df_vidas_operadora(["368253"]),
+        "exec": lambda: extrator_pentaho().df_vidas_operadora(["368253"]),
     },
     {
         "title": "Sair",
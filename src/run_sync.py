@@ -0,0 +1,142 @@
+"""
+Sincronização incremental dos dados de IGR (guiada pela data de atualização do Power BI) e de vidas do Pentaho
+"""
+
+import logging
+import os
+import threading
+
+from src.utils.armazenamento import ArmazenamentoParquet
+from src.utils.diario import DiarioExecucao
+from src.utils.extract_pbi import ExtratorPBI, FalhaExtracao, indice_periodo, periodos_revisaveis
+from src.utils.extract_pentaho import ExtracaoIncompleta, ExtratorPentaho
+from src.utils.sessao_navegador import SessaoNavegador
+from src.utils.watermark import Watermark
+
+
+def verificar_atualizacao(logger: logging.Logger) -> bool:
+    """
+    Consulta apenas a data de atualização do relatório e compara com o watermark do IGR
+
+    Returns:
+        True se há dados novos a sincronizar (data diferente do watermark)
+    """
+    data_atualizacao = ExtratorPBI(logger, usar_cache=False).data_atualizacao()
+    if data_atualizacao is None:
+        return False
+
+    ultima = Watermark().ler("IGR")
+    if ultima == data_atualizacao:
+        logger.info("⏭️ Data de atualização inalterada (%s)", data_atualizacao)
+        return False
+    logger.info("🆕 Nova data de atualização: %s (watermark %s)", data_atualizacao, ultima)
+    return True
+
+
+def run_sync(logger: logging.Logger, forcar: bool = False):
+    """
+    Executa uma sincronização do IGR
+
+    * Consulta a data de atualização do relatório ("Capa_Cartão atualização")
+    * Se for igual ao watermark, nada é extraído
+    * Se mudou, extrai novamente os meses que ainda podem ser revisados
+      (IGR_MESES_REVISAVEIS, padrão 3, contados a partir do último mês publicado) e todos os
+      publicados depois do último período sincronizado; sem watermark, extrai a grade completa
+    * As partições Ano/Mês extraídas são sobrescritas no armazenamento Parquet
+
+    Args:
+        logger: Logger da aplicação
+        forcar: Ignora o watermark e extrai a grade completa
+
+    Returns:
+        DataFrame extraído ou None se nada foi extraído
+    """
+    watermark = Watermark()
+    # A sincronização só extrai quando o relatório mudou: respostas em cache estariam desatualizadas
+    # O diário permite retomar a grade interrompida (queda de rede, Ctrl+C) sem repetir o que já terminou
+    extrator = ExtratorPBI(logger, usar_cache=False, diario=DiarioExecucao())
+
+    data_atualizacao = extrator.data_atualizacao()
+    if data_atualizacao is None:
+        logger.error("❌ Não foi possível obter a data de atualização; sincronização adiada")
+        return None
+
+    ultima = None if forcar else watermark.ler("IGR")
+    if ultima == data_atualizacao:
+        logger.info("⏭️ Data de atualização inalterada (%s): extração ignorada", data_atualizacao)
+        return None
+
+    sincronizado = None if ultima is None else watermark.ler_periodo("IGR")
+    ultimo_periodo = None if sincronizado is None else extrator.ultimo_periodo_publicado(data_atualizacao)
+    if ultima is None:
+        logger.info("🆕 Sem watermark (ou sincronização forçada): extraindo a grade completa")
+        periodos = None
+    elif sincronizado is None:
+        # Watermark sem período: não há como saber quantos meses foram publicados desde então
+        logger.warning("⚠️ Último período sincronizado desconhecido: extraindo a grade completa")
+        periodos = None
+    elif ultimo_periodo is None:
+        logger.warning("⚠️ Último mês publicado desconhecido: extraindo a grade completa")
+        periodos = None
+    else:
+        quantidade = int(os.getenv("IGR_MESES_REVISAVEIS", "3"))
+        periodos = periodos_revisaveis(ultimo_periodo, quantidade, sincronizado)
+        logger.info("🔄 Atualização %s -> %s: extraindo %s", ultima, data_atualizacao, periodos)
+
+    try:
+        df = extrator.dados_IGR(periodos, data_atualizacao)
+    except FalhaExtracao as e:
+        # Grade incompleta: nada é gravado e o watermark não avança; a próxima execução retoma pelo diário
+        logger.error("❌ %s; watermark mantido em %s", e, ultima)
+        return None
+    if df is None:
+        logger.warning("⚠️ Nenhum dado extraído; watermark mantido em %s", ultima)
+        return None
+
+    ArmazenamentoParquet(logger=logger).gravar(df, "IGR", modo="sobrescrever")
+    periodo = ultimo_periodo_extraido(df, sincronizado)
+    watermark.gravar("IGR", data_atualizacao, periodo)
+    logger.info("✅ Sincronização concluída: %s linhas (watermark %s, até %s)", len(df), data_atualizacao, periodo)
+    return df
+
+
+def ultimo_periodo_extraido(df, anterior: tuple[str, str] | None = None) -> tuple[str, str] | None:
+    """Último (ano, mês) presente no DataFrame de IGR, sem retroceder em relação a `anterior`"""
+    periodos = {(str(ano), str(mes)) for ano, mes in df[["Ano", "Mês"]].drop_duplicates().itertuples(index=False)}
+    if anterior is not None:
+        periodos.add(tuple(anterior))
+    return max(periodos, key=indice_periodo) if periodos else None
+
+
+def run_sync_pentaho(
+    logger: logging.Logger,
+    operadoras: list[str],
+    sessao: SessaoNavegador | None = None,
+    cancelar: threading.Event | None = None,
+):
+    """
+    Extrai as vidas das operadoras no Pentaho e sobrescreve suas partições (Cubo/Registro) no armazenamento
+
+    Args:
+        logger: Logger da aplicação
+        operadoras: Códigos de Registro ANS
+        sessao: Navegador reaproveitado entre execuções (None abre um navegador por execução)
+        cancelar: Evento que interrompe a extração antes do próximo bloco (retomável pelo diário, nada é gravado)
+
+    Returns:
+        DataFrame extraído ou None se nada foi extraído
+    """
+    extrator = ExtratorPentaho(logger, headless=True, sessao=sessao, diario=DiarioExecucao())
+    try:
+        df = extrator.df_vidas_operadora(operadoras, consulta_unica=True, cancelar=cancelar)
+    except ExtracaoIncompleta as e:
+        # Blocos com falha: nada é gravado; a próxima execução no mesmo dia retoma pelo diário
+        logger.error("❌ %s", e)
+        return None
+    if df is None or df.empty:
+        logger.warning("⚠️ Nenhuma vida extraída do Pentaho para %s operadora(s)", len(operadoras))
+        return None
+
+    ArmazenamentoParquet(logger=logger).gravar(df, "Pentaho", modo="sobrescrever")
+    logger.info("✅ Sincronização do Pentaho concluída: %s linhas", len(df))
+    return df
@@ -0,0 +1,349 @@
+"""
+Agendador de tarefas periódicas (intervalo ou cron) com execução em threads e estado persistido
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from .metricas import METRICAS
+
+CAMPOS_CRON = [("minuto", 0, 59), ("hora", 0, 23), ("dia", 1, 31), ("mês", 1, 12), ("dia da semana", 0, 6)]
+"""Campos da expressão cron (nome, mínimo, máximo), na ordem padrão de 5 campos"""
+
+ESPERA_MAXIMA = 60.0
+"""Espera máxima (s) entre verificações do laço, para acompanhar mudanças no relógio do sistema"""
+
+
+class ExpressaoCron:
+    """
+    Expressão cron de 5 campos: minuto, hora, dia do mês, mês e dia da semana (0 ou 7 = domingo)
+
+    Aceita `*`, valores, intervalos (`1-5`), listas (`1,15`) e passos (`*/10`, `8-18/2`).
+    Como no cron, se dia do mês e dia da semana forem ambos restritos, basta um deles coincidir.
+
+    Exemplo:
+        ExpressaoCron("30 6 * * 1-5").proxima(datetime.now())  # próximo dia útil às 06:30
+    """
+
+    def __init__(self, expressao: str):
+        partes = expressao.split()
+        if len(partes) != 5:
+            raise ValueError(f"Expressão cron deve ter 5 campos: {expressao!r}")
+
+        self.expressao = expressao
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = [
+            self._interpretar(parte, nome, minimo, maximo + (nome == "dia da semana"))
+            for parte, (nome, minimo, maximo) in zip(partes, CAMPOS_CRON)
+        ]
+        self.dias_semana = {dia % 7 for dia in dias_semana}
+        self._dia_restrito = partes[2] != "*"
+        self._semana_restrita = partes[4] != "*"
+
+    @staticmethod
+    def _interpretar(campo: str, nome: str, minimo: int, maximo: int) -> set[int]:
+        valores = set()
+        for item in campo.split(","):
+            faixa, _, passo = item.partition("/")
+            if faixa == "*":
+                inicio, fim = minimo, maximo
+            elif "-" in faixa:
+                inicio, fim = (int(valor) for valor in faixa.split("-", 1))
+            else:
+                inicio = fim = int(faixa)
+                if passo:
+                    fim = maximo
+            if not minimo <= inicio <= fim <= maximo:
+                raise ValueError(f"Valor fora do intervalo no campo {nome}: {item!r}")
+            valores.update(range(inicio, fim + 1, int(passo) if passo else 1))
+        return valores
+
+    def _dia_coincide(self, dia: datetime) -> bool:
+        no_mes = dia.day in self.dias
+        na_semana = dia.isoweekday() % 7 in self.dias_semana
+        if self._dia_restrito and self._semana_restrita:
+            return no_mes or na_semana
+        return no_mes and na_semana
+
+    def proxima(self, apos: datetime) -> datetime:
+        """Primeiro horário da expressão estritamente posterior a `apos`"""
+        inicio = apos.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        dia = inicio.replace(hour=0, minute=0)
+
+        # Percorre dia a dia (até 5 anos, cobre 29/02) e, no dia válido, a primeira hora:minuto disponível
+        for _ in range(366 * 5):
+            if dia.month in self.meses and self._dia_coincide(dia):
+                for hora in sorted(self.horas):
+                    for minuto in sorted(self.minutos):
+                        candidato = dia.replace(hour=hora, minute=minuto)
+                        if candidato >= inicio:
+                            return candidato
+            dia += timedelta(days=1)
+        raise ValueError(f"Expressão cron sem ocorrências: {self.expressao!r}")
+
+    def __repr__(self):
+        return f"ExpressaoCron({self.expressao!r})"
+
+
+class Tarefa:
+    """
+    Definição de uma tarefa agendada
+
+    Exemplo:
+        Tarefa("data_pbi", verificar, intervalo=600, jitter=30)
+        Tarefa("igr", sincronizar, cron="0 7 * * *", recuperar_perdidas=True)
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        funcao: Callable[[], object],
+        intervalo: float | None = None,
+        cron: str | None = None,
+        jitter: float = 0,
+        recuperar_perdidas: bool = True,
+        executar_ao_iniciar: bool = False,
+    ):
+        """
+        Args:
+            nome: Identificador da tarefa (chave do estado persistido)
+            funcao: Função executada, sem argumentos
+            intervalo: Intervalo (s) entre execuções previstas
+            cron: Expressão cron (alternativa a `intervalo`)
+            jitter: Atraso aleatório máximo (s) somado a cada execução (evita rajadas sincronizadas)
+            recuperar_perdidas: Executa uma vez ao iniciar se houve execução prevista com o serviço parado
+            executar_ao_iniciar: Executa imediatamente na primeira inicialização (sem estado persistido)
+        """
+        if (intervalo is None) == (cron is None):
+            raise ValueError(f"Tarefa {nome}: informe exatamente um entre intervalo e cron")
+        if intervalo is not None and intervalo <= 0:
+            raise ValueError(f"Tarefa {nome}: intervalo deve ser positivo")
+
+        self.nome = nome
+        self.funcao = funcao
+        self.intervalo = intervalo
+        self.cron = ExpressaoCron(cron) if cron else None
+        self.jitter = max(0.0, float(jitter))
+        self.recuperar_perdidas = recuperar_perdidas
+        self.executar_ao_iniciar = executar_ao_iniciar
+
+    def proxima_prevista(self, anterior: datetime | None, agora: datetime) -> datetime:
+        """
+        Próximo horário previsto (sem jitter) posterior a `agora`
+
+        Intervalos contam a partir do horário previsto anterior (sem deriva); horários que
+        ficaram para trás são pulados em vez de acumulados.
+        """
+        if self.cron is not None:
+            return self.cron.proxima(agora)
+
+        passo = timedelta(seconds=self.intervalo)
+        if anterior is None:
+            return agora + passo
+        atrasos = max(0, int((agora - anterior) / passo))
+        return anterior + passo * (atrasos + 1)
+
+    def descricao(self) -> str:
+        return f"cron {self.cron.expressao}" if self.cron else f"a cada {self.intervalo:g}s"
+
+
+class Agendador:
+    """
+    Executa tarefas periódicas, cada execução em uma thread daemon
+
+    * Cada tarefa tem intervalo ou expressão cron próprios e roda na própria thread:
+      uma extração lenta do Pentaho não atrasa a verificação de data do Power BI
+    * Ao encerrar, `cancelar` é sinalizado para as tarefas em andamento e o processo não as aguarda
+    * Uma tarefa nunca roda sobreposta a si mesma: a execução prevista durante outra é pulada
+    * O laço dorme exatamente até a próxima execução prevista (ou até `antecipar`/`parar`)
+    * Última e próxima execução de cada tarefa ficam em um JSON (gravação atômica); ao reiniciar,
+      execuções perdidas com o serviço parado são recuperadas uma única vez
+
+    Exemplo:
+        agendador = Agendador(logger, [Tarefa("igr", sincronizar, cron="0 7 * * *")])
+        agendador.executar()  # bloqueia até parar() ou Ctrl+C
+
+    Tarefas longas devem consultar `agendador.cancelar` para interromper a execução ao encerrar.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        tarefas: list[Tarefa],
+        caminho_estado: str | Path = Path("state") / "agendador.json",
+    ):
+        """
+        Args:
+            logger: Logger da aplicação
+            tarefas: Tarefas agendadas (nomes únicos)
+            caminho_estado: Arquivo JSON com última e próxima execução de cada tarefa
+        """
+        nomes = [tarefa.nome for tarefa in tarefas]
+        if len(set(nomes)) != len(nomes):
+            raise ValueError(f"Nomes de tarefa repetidos: {nomes}")
+
+        self.logger = logger
+        self.tarefas = {tarefa.nome: tarefa for tarefa in tarefas}
+        self.caminho_estado = Path(caminho_estado)
+
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._ativo = False
+        self.cancelar = threading.Event()
+        """Sinalizado ao encerrar o agendador, para as tarefas em andamento interromperem a execução"""
+        self._em_execucao: dict[str, threading.Thread] = {}
+        self._previstas: dict[str, datetime] = {}  # horário previsto sem jitter
+        self._proximas: dict[str, datetime] = {}  # horário efetivo (com jitter)
+        self._estado = self._carregar()
+
+    def _carregar(self) -> dict:
+        try:
+            with open(self.caminho_estado, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _salvar(self):
+        """Grava o estado (chamar com o lock adquirido)"""
+        self.caminho_estado.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho_estado.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self._estado, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho_estado)
+
+    def _agendar(self, tarefa: Tarefa, prevista: datetime):
+        """Registra a próxima execução (chamar com o lock adquirido)"""
+        proxima = prevista + timedelta(seconds=random.uniform(0, tarefa.jitter))
+        self._previstas[tarefa.nome] = prevista
+        self._proximas[tarefa.nome] = proxima
+        self._estado.setdefault(tarefa.nome, {})["proxima_execucao"] = proxima.isoformat(timespec="seconds")
+
+    def _planejar_inicio(self, agora: datetime):
+        """Define a primeira execução de cada tarefa a partir do estado persistido"""
+        with self._lock:
+            for tarefa in self.tarefas.values():
+                estado = self._estado.get(tarefa.nome, {})
+                registrada = estado.get("proxima_execucao")
+                registrada = datetime.fromisoformat(registrada) if registrada else None
+
+                if registrada is None:
+                    if tarefa.executar_ao_iniciar:
+                        self._agendar(tarefa, agora)
+                    else:
+                        self._agendar(tarefa, tarefa.proxima_prevista(None, agora))
+                elif registrada > agora and (
+                    tarefa.intervalo is None or registrada <= agora + timedelta(seconds=tarefa.intervalo + tarefa.jitter)
+                ):
+                    # Mantém o horário já calculado (e o jitter sorteado) antes do reinício
+                    self._previstas[tarefa.nome] = self._proximas[tarefa.nome] = registrada
+                elif registrada > agora:
+                    # Intervalo reduzido desde o último reinício: recalcula a partir de agora
+                    self._agendar(tarefa, tarefa.proxima_prevista(None, agora))
+                elif tarefa.recuperar_perdidas:
+                    self.logger.info("⏰ %s: execução prevista para %s perdida; recuperando agora", tarefa.nome, registrada)
+                    self._previstas[tarefa.nome] = registrada
+                    self._proximas[tarefa.nome] = agora
+                else:
+                    self._agendar(tarefa, tarefa.proxima_prevista(registrada, agora))
+
+                self.logger.info(
+                    "🗓️ %s (%s): próxima execução em %s",
+                    tarefa.nome,
+                    tarefa.descricao(),
+                    self._proximas[tarefa.nome].isoformat(sep=" ", timespec="seconds"),
+                )
+            self._salvar()
+
+    def _disparar(self, tarefa: Tarefa, agora: datetime):
+        """Inicia a tarefa em uma thread (ou pula, se ainda em execução) e agenda a próxima"""
+        with self._lock:
+            thread = self._em_execucao.get(tarefa.nome)
+            if thread is not None and thread.is_alive():
+                self.logger.warning("⏭️ %s ainda em execução: execução prevista ignorada", tarefa.nome)
+                METRICAS.incrementar(
+                    "hermes_agendador_sobreposicoes_total", 1, "Execuções puladas por sobreposição", tarefa=tarefa.nome
+                )
+            else:
+                thread = threading.Thread(
+                    target=self._executar, args=(tarefa,), name=f"agendador-{tarefa.nome}", daemon=True
+                )
+                self._em_execucao[tarefa.nome] = thread
+                thread.start()
+
+            self._agendar(tarefa, tarefa.proxima_prevista(self._previstas[tarefa.nome], agora))
+            self._salvar()
+
+    def _executar(self, tarefa: Tarefa):
+        inicio = time.perf_counter()
+        iniciada_em = datetime.now().isoformat(timespec="seconds")
+        resultado = "ok"
+        self.logger.info("▶️ Iniciando tarefa %s", tarefa.nome)
+        try:
+            tarefa.funcao()
+        except Exception as e:
+            resultado = "erro"
+            self.logger.error("❌ Tarefa %s falhou: %s", tarefa.nome, e, exc_info=True)
+        duracao = time.perf_counter() - inicio
+
+        METRICAS.observar(
+            "hermes_agendador_execucao_segundos",
+            duracao,
+            "Duração das tarefas agendadas",
+            tarefa=tarefa.nome,
+            resultado=resultado,
+        )
+        with self._lock:
+            self._estado.setdefault(tarefa.nome, {}).update(
+                ultima_execucao=iniciada_em,
+                ultima_conclusao=datetime.now().isoformat(timespec="seconds"),
+                ultimo_resultado=resultado,
+                ultima_duracao=round(duracao, 3),
+            )
+            self._salvar()
+        METRICAS.gravar_arquivo()
+        self.logger.info("⏹️ Tarefa %s finalizada (%s) em %.1fs", tarefa.nome, resultado, duracao)
+
+    def antecipar(self, nome: str):
+        """Executa a tarefa o quanto antes (ex: verificação de data detectou dados novos)"""
+        with self._lock:
+            self._proximas[nome] = self._previstas[nome] = datetime.now()
+        self._acordar.set()
+
+    def estado(self) -> dict:
+        """Cópia do estado persistido (última e próxima execução por tarefa)"""
+        with self._lock:
+            return json.loads(json.dumps(self._estado))
+
+    def executar(self):
+        """Roda o laço do agendador na thread atual até `parar()` (ou KeyboardInterrupt)"""
+        self.cancelar.clear()
+        self._ativo = True
+        self._planejar_inicio(datetime.now())
+        try:
+            while self._ativo:
+                agora = datetime.now()
+                for nome, proxima in list(self._proximas.items()):
+                    if proxima <= agora:
+                        self._disparar(self.tarefas[nome], agora)
+
+                with self._lock:
+                    espera = (min(self._proximas.values()) - datetime.now()).total_seconds()
+                self._acordar.wait(min(max(espera, 0.0), ESPERA_MAXIMA))
+                self._acordar.clear()
+        finally:
+            self._ativo = False
+            # Tarefas em andamento (ex: Pentaho) recebem o cancelamento; por serem daemon, as threads
+            # não seguram a saída do processo se ainda estiverem presas em uma requisição
+            self.cancelar.set()
+
+    def parar(self):
+        """Encerra o laço de `executar()` e sinaliza `cancelar` para as tarefas em andamento"""
+        self._ativo = False
+        self.cancelar.set()
+        self._acordar.set()
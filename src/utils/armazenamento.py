@@ -0,0 +1,164 @@
+"""
+Armazenamento particionado em Parquet dos resultados extraídos
+"""
+
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+PARTICOES = {
+    "IGR": ["Ano", "Mês"],
+    "Pentaho": ["Cubo", "Registro"],
+}
+"""Colunas de partição de cada dataset"""
+
+
+class ArmazenamentoParquet:
+    """
+    Grava e lê datasets em Parquet particionados no formato `coluna=valor/` (estilo Hive)
+
+    * Cada gravação cria arquivos novos via arquivo temporário + os.replace (append atômico)
+    * `modo="sobrescrever"` substitui por inteiro as partições presentes no DataFrame
+      (a partição nova é montada ao lado e trocada por renomeação)
+    * A leitura poda as partições pelos filtros e lê apenas as colunas pedidas
+    """
+
+    def __init__(self, raiz: str | Path = "dados", logger: logging.Logger | None = None):
+        """
+        Args:
+            raiz: Pasta raiz dos datasets
+            logger: Logger da aplicação
+        """
+        self.raiz = Path(raiz)
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _diretorio(self, dataset: str, particoes: list[str], valores: tuple) -> Path:
+        diretorio = self.raiz / dataset
+        for coluna, valor in zip(particoes, valores):
+            diretorio /= f"{coluna}={quote(str(valor), safe='')}"
+        return diretorio
+
+    def gravar(self, df: pd.DataFrame, dataset: str, modo: str = "append", particoes: list[str] | None = None):
+        """
+        Grava um DataFrame no dataset, particionado pelas colunas de partição
+
+        Args:
+            df: Dados a gravar (deve conter as colunas de partição)
+            dataset: Nome do dataset (ex: "IGR")
+            modo: "append" acrescenta arquivos; "sobrescrever" substitui as partições presentes em `df`
+            particoes: Colunas de partição; padrão PARTICOES[dataset]
+
+        Returns:
+            Lista das pastas de partição gravadas
+        """
+        if modo not in ("append", "sobrescrever"):
+            raise ValueError(f"Modo inválido: {modo}")
+        particoes = particoes or PARTICOES[dataset]
+
+        gravadas = []
+        for valores, grupo in df.groupby(particoes, sort=False, observed=True, dropna=False):
+            valores = valores if isinstance(valores, tuple) else (valores,)
+            diretorio = self._diretorio(dataset, particoes, valores)
+            dados = grupo.drop(columns=particoes)
+
+            if modo == "append":
+                diretorio.mkdir(parents=True, exist_ok=True)
+                self._gravar_arquivo(dados, diretorio)
+            else:
+                self._substituir_particao(dados, diretorio)
+            gravadas.append(diretorio)
+
+        self.logger.info("💾 %s: %s linhas gravadas em %s partição(ões) (%s)", dataset, len(df), len(gravadas), modo)
+        return gravadas
+
+    @staticmethod
+    def _gravar_arquivo(dados: pd.DataFrame, diretorio: Path) -> Path:
+        nome = f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        # Arquivos ocultos (.) são ignorados pela leitura até a renomeação final
+        temporario = diretorio / f".{nome}.tmp"
+        dados.to_parquet(temporario, index=False)
+        destino = diretorio / nome
+        os.replace(temporario, destino)
+        return destino
+
+    def _substituir_particao(self, dados: pd.DataFrame, diretorio: Path):
+        diretorio.parent.mkdir(parents=True, exist_ok=True)
+        novo = diretorio.with_name(f".{diretorio.name}.{uuid.uuid4().hex[:8]}.novo")
+        novo.mkdir()
+        self._gravar_arquivo(dados, novo)
+
+        antigo = diretorio.with_name(f".{diretorio.name}.{uuid.uuid4().hex[:8]}.antigo")
+        if diretorio.exists():
+            os.replace(diretorio, antigo)
+        os.replace(novo, diretorio)
+        shutil.rmtree(antigo, ignore_errors=True)
+
+    def listar_particoes(self, dataset: str, filtros: dict[str, list] | None = None) -> list[tuple[Path, dict]]:
+        """
+        Lista as partições do dataset, podadas pelos filtros
+
+        Args:
+            dataset: Nome do dataset
+            filtros: Valores aceitos por coluna de partição (ex: {"Ano": ["2025"], "Mês": ["jan"]})
+
+        Returns:
+            Lista de (pasta, {coluna: valor})
+        """
+        filtros = {coluna: {str(v) for v in valores} for coluna, valores in (filtros or {}).items()}
+        encontradas = []
+
+        def visitar(pasta: Path, valores: dict):
+            subparticoes = self._subparticoes(pasta)
+            if not subparticoes:
+                if valores:
+                    encontradas.append((pasta, valores))
+                return
+            for sub in subparticoes:
+                coluna, valor = sub.name.split("=", 1)
+                valor = unquote(valor)
+                if coluna not in filtros or valor in filtros[coluna]:
+                    visitar(sub, {**valores, coluna: valor})
+
+        visitar(self.raiz / dataset, {})
+        return encontradas
+
+    @staticmethod
+    def _subparticoes(pasta: Path) -> list[Path]:
+        if not pasta.is_dir():
+            return []
+        return sorted(p for p in pasta.iterdir() if p.is_dir() and "=" in p.name and not p.name.startswith("."))
+
+    def ler(
+        self, dataset: str, colunas: list[str] | None = None, filtros: dict[str, list] | None = None
+    ) -> pd.DataFrame:
+        """
+        Lê o dataset com projeção de colunas e poda de partições
+
+        Args:
+            dataset: Nome do dataset
+            colunas: Colunas a carregar (None = todas); colunas de partição são restauradas se pedidas
+            filtros: Valores aceitos por coluna de partição
+
+        Returns:
+            DataFrame (vazio se nenhuma partição corresponder)
+        """
+        frames = []
+        for pasta, valores in self.listar_particoes(dataset, filtros):
+            colunas_arquivo = None if colunas is None else [c for c in colunas if c not in valores]
+            for arquivo in sorted(pasta.glob("part-*.parquet")):
+                df = pd.read_parquet(arquivo, columns=colunas_arquivo)
+                for coluna, valor in valores.items():
+                    if colunas is None or coluna in colunas:
+                        df[coluna] = valor
+                frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=colunas)
+        df = pd.concat(frames, ignore_index=True)
+        return df[colunas] if colunas is not None else df
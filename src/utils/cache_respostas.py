@@ -0,0 +1,151 @@
+"""
+Cache local persistente das respostas do querydata (SQLite)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+
+class CacheRespostas:
+    """
+    Cache de respostas endereçado pelo conteúdo do payload e pela versão dos dados
+
+    * Chave: SHA-256 da versão (ex: data de atualização do relatório) e do payload em JSON canônico
+      (chaves ordenadas, sem espaços); uma nova versão nunca reaproveita respostas da anterior
+    * Corpo armazenado comprimido (zlib)
+    * Entradas expiram após `ttl` segundos
+    * Ao ultrapassar `tamanho_maximo` bytes, as entradas menos usadas recentemente são removidas (LRU)
+
+    O arquivo SQLite pode ser compartilhado entre processos (CLI, Streamlit, agendador).
+    """
+
+    def __init__(
+        self,
+        caminho: str | Path = Path("cache") / "respostas.sqlite",
+        ttl: float = 6 * 3600,
+        tamanho_maximo: int = 256 * 1024 * 1024,
+    ):
+        """
+        Args:
+            caminho: Arquivo SQLite do cache
+            ttl: Validade (s) de cada resposta
+            tamanho_maximo: Tamanho máximo (bytes comprimidos) antes da remoção LRU
+        """
+        self.caminho = Path(caminho)
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                corpo BLOB NOT NULL,
+                tamanho INTEGER NOT NULL,
+                tamanho_original INTEGER NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+            """
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+
+        self._acertos = 0
+        self._falhas = 0
+        self._bytes_evitados = 0
+
+    @staticmethod
+    def chave(payload: dict, versao: str | None = None) -> str:
+        """Hash da versão dos dados e do payload em JSON canônico"""
+        canonico = json.dumps([versao, payload], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+    def obter(self, payload: dict, versao: str | None = None) -> dict | None:
+        """
+        Args:
+            payload: Payload enviado
+            versao: Versão dos dados (ex: data de atualização do relatório)
+
+        Returns:
+            Resposta armazenada (JSON) ou None se ausente ou expirada
+        """
+        chave = self.chave(payload, versao)
+        agora = time.time()
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT corpo, tamanho_original FROM respostas WHERE chave = ? AND criado_em >= ?",
+                (chave, agora - self.ttl),
+            ).fetchone()
+            if linha is None:
+                self._falhas += 1
+                return None
+            self._conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self._acertos += 1
+            self._bytes_evitados += linha[1]
+        return json.loads(zlib.decompress(linha[0]))
+
+    def gravar(self, payload: dict, corpo: bytes, versao: str | None = None):
+        """
+        Armazena o corpo bruto (JSON) da resposta de um payload
+
+        Args:
+            payload: Payload enviado
+            corpo: Bytes do corpo da resposta
+            versao: Versão dos dados (ex: data de atualização do relatório)
+        """
+        comprimido = zlib.compress(corpo, 6)
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?)",
+                (self.chave(payload, versao), comprimido, len(comprimido), len(corpo), agora, agora),
+            )
+            self._remover_excedente(agora)
+
+    def _remover_excedente(self, agora: float):
+        """Remove entradas expiradas e, se necessário, as menos usadas recentemente"""
+        self._conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - self.ttl,))
+        total = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.tamanho_maximo:
+            return
+
+        remover = []
+        linhas = self._conexao.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado_em").fetchall()
+        for chave, tamanho in linhas:
+            if total <= self.tamanho_maximo:
+                break
+            remover.append((chave,))
+            total -= tamanho
+        self._conexao.executemany("DELETE FROM respostas WHERE chave = ?", remover)
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._conexao.execute("DELETE FROM respostas")
+
+    def estatisticas(self) -> dict:
+        """
+        Returns:
+            dict com acertos, falhas, taxa_acerto, bytes_evitados, entradas e tamanho (bytes comprimidos)
+        """
+        with self._lock:
+            entradas, tamanho = self._conexao.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+            consultas = self._acertos + self._falhas
+            return {
+                "acertos": self._acertos,
+                "falhas": self._falhas,
+                "taxa_acerto": round(self._acertos / consultas, 4) if consultas else 0.0,
+                "bytes_evitados": self._bytes_evitados,
+                "entradas": entradas,
+                "tamanho": tamanho,
+            }
@@ -0,0 +1,6 @@
+"""
+Calendário do relatório do Power BI (sem dependências pesadas: importado na inicialização)
+"""
+
+MESES = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+"""Meses abreviados como aparecem no relatório, em ordem cronológica"""
@@ -0,0 +1,196 @@
+"""
+Diário de execução (SQLite) com checkpoint por unidade de trabalho para retomar extrações longas
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .esquemas import concatenar
+
+PENDENTE = "pendente"
+CONCLUIDA = "concluida"
+VAZIA = "vazia"
+ERRO = "erro"
+
+
+class DiarioExecucao:
+    """
+    Registra o estado de cada unidade (combinação da grade, bloco de operadoras) de uma execução
+
+    * Cada unidade concluída tem o resultado gravado em Parquet e o caminho anotado no diário
+    * Uma execução interrompida (queda de rede, Chrome, Ctrl+C) é retomada pela mesma chave:
+      apenas as unidades não concluídas são extraídas novamente
+    * Os resultados parciais são concatenados uma única vez ao final (`resultados`)
+
+    Exemplo:
+        diario = DiarioExecucao()
+        execucao = diario.iniciar("IGR", data_atualizacao, chaves)
+        for chave in diario.pendentes(execucao):
+            try:
+                diario.concluir(execucao, chave, extrair(chave))
+            except Exception as e:
+                diario.falhar(execucao, chave, str(e))
+        if not diario.pendentes(execucao):  # Unidades com erro mantêm a execução aberta
+            df = diario.resultados(execucao)
+            diario.finalizar(execucao)
+    """
+
+    def __init__(self, caminho: str | Path = Path("state") / "diario.sqlite"):
+        """
+        Args:
+            caminho: Arquivo SQLite do diário; os resultados parciais ficam na pasta `<caminho sem extensão>/`
+        """
+        self.caminho = Path(caminho)
+        self.pasta_resultados = self.caminho.with_suffix("")
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS execucoes (
+                id TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                parametros TEXT NOT NULL,
+                status TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                concluido_em REAL
+            );
+            CREATE TABLE IF NOT EXISTS unidades (
+                execucao TEXT NOT NULL,
+                ordem INTEGER NOT NULL,
+                chave TEXT NOT NULL,
+                status TEXT NOT NULL,
+                saida TEXT,
+                linhas INTEGER,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                erro TEXT,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (execucao, chave)
+            );
+            """
+        )
+
+    @staticmethod
+    def identificador(tipo: str, parametros, chaves: list[str]) -> str:
+        """Identificador estável da execução: o mesmo trabalho gera o mesmo id após um reinício"""
+        conteudo = json.dumps([tipo, parametros, chaves], sort_keys=True, ensure_ascii=False, default=str)
+        return f"{tipo}-{hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]}"
+
+    def iniciar(self, tipo: str, parametros, chaves: list[str]) -> str:
+        """
+        Abre (ou retoma) a execução das unidades `chaves`
+
+        Args:
+            tipo: Tipo da extração (ex: "IGR", "Pentaho")
+            parametros: Parâmetros que identificam a execução (ex: data de atualização)
+            chaves: Chaves das unidades de trabalho, na ordem do resultado final
+
+        Returns:
+            Identificador da execução
+        """
+        execucao = self.identificador(tipo, parametros, chaves)
+        agora = time.time()
+        with self._lock:
+            linha = self._conexao.execute("SELECT status FROM execucoes WHERE id = ?", (execucao,)).fetchone()
+            if linha is not None and linha[0] == CONCLUIDA:
+                # Execução já finalizada: recomeça do zero
+                self._conexao.execute("DELETE FROM unidades WHERE execucao = ?", (execucao,))
+                self._conexao.execute("DELETE FROM execucoes WHERE id = ?", (execucao,))
+                linha = None
+
+            self._conexao.execute("BEGIN")
+            if linha is None:
+                self._conexao.execute(
+                    "INSERT INTO execucoes (id, tipo, parametros, status, criado_em) VALUES (?, ?, ?, ?, ?)",
+                    (execucao, tipo, json.dumps(parametros, ensure_ascii=False, default=str), PENDENTE, agora),
+                )
+            self._conexao.executemany(
+                "INSERT OR IGNORE INTO unidades (execucao, ordem, chave, status, atualizado_em) VALUES (?, ?, ?, ?, ?)",
+                [(execucao, ordem, chave, PENDENTE, agora) for ordem, chave in enumerate(chaves)],
+            )
+            self._conexao.execute("COMMIT")
+        return execucao
+
+    def pendentes(self, execucao: str) -> list[str]:
+        """Chaves das unidades ainda não concluídas (pendentes ou com erro), em ordem"""
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT chave FROM unidades WHERE execucao = ? AND status IN (?, ?) ORDER BY ordem",
+                (execucao, PENDENTE, ERRO),
+            ).fetchall()
+        return [chave for (chave,) in linhas]
+
+    def concluir(self, execucao: str, chave: str, df: pd.DataFrame | None):
+        """
+        Grava o resultado da unidade (None ou vazio = unidade sem dados) e marca como concluída
+
+        Uma extração que falhou não deve ser registrada aqui (ficaria como vazia e não seria refeita): use `falhar`
+        """
+        saida = None
+        status = VAZIA
+        linhas = 0
+        if df is not None and not df.empty:
+            pasta = self.pasta_resultados / execucao
+            pasta.mkdir(parents=True, exist_ok=True)
+            saida = pasta / f"{hashlib.sha256(chave.encode('utf-8')).hexdigest()[:16]}.parquet"
+            temporario = saida.with_name(f".{saida.name}.tmp")
+            df.to_parquet(temporario, index=False)
+            os.replace(temporario, saida)
+            status = CONCLUIDA
+            linhas = len(df)
+
+        with self._lock:
+            self._conexao.execute(
+                "UPDATE unidades SET status = ?, saida = ?, linhas = ?, erro = NULL, tentativas = tentativas + 1, "
+                "atualizado_em = ? WHERE execucao = ? AND chave = ?",
+                (status, None if saida is None else str(saida), linhas, time.time(), execucao, chave),
+            )
+
+    def falhar(self, execucao: str, chave: str, erro: str):
+        """Marca a unidade com erro (será extraída novamente ao retomar)"""
+        with self._lock:
+            self._conexao.execute(
+                "UPDATE unidades SET status = ?, erro = ?, tentativas = tentativas + 1, atualizado_em = ? "
+                "WHERE execucao = ? AND chave = ?",
+                (ERRO, erro, time.time(), execucao, chave),
+            )
+
+    def progresso(self, execucao: str) -> dict:
+        """Quantidade de unidades por status"""
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT status, COUNT(*) FROM unidades WHERE execucao = ? GROUP BY status", (execucao,)
+            ).fetchall()
+        return dict(linhas)
+
+    def resultados(self, execucao: str) -> pd.DataFrame | None:
+        """Concatena, uma única vez e na ordem das unidades, os resultados gravados da execução"""
+        with self._lock:
+            saidas = self._conexao.execute(
+                "SELECT saida FROM unidades WHERE execucao = ? AND saida IS NOT NULL ORDER BY ordem", (execucao,)
+            ).fetchall()
+        dfs = [pd.read_parquet(saida) for (saida,) in saidas]
+        return concatenar(dfs) if dfs else None
+
+    def finalizar(self, execucao: str, remover_parciais: bool = True):
+        """Marca a execução como concluída e remove os resultados parciais (já consolidados)"""
+        with self._lock:
+            self._conexao.execute(
+                "UPDATE execucoes SET status = ?, concluido_em = ? WHERE id = ?", (CONCLUIDA, time.time(), execucao)
+            )
+        if remover_parciais:
+            shutil.rmtree(self.pasta_resultados / execucao, ignore_errors=True)
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
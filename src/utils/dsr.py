@@ -0,0 +1,147 @@
+"""
+Decodificador do formato DSR (Data Shape Result) retornado pelo endpoint querydata do Power BI
+"""
+
+from .templates import substituir
+
+BIT_REPETICAO = "R"
+"""Bitmask das colunas cujo valor se repete da linha anterior"""
+
+BIT_NULO = "Ø"
+"""Bitmask das colunas com valor nulo"""
+
+
+def obter_dataset(data: dict, indice_resultado: int = 0) -> dict:
+    """
+    Retorna o primeiro dataset (DS) de um resultado do querydata
+
+    Args:
+        data: JSON de resposta do querydata
+        indice_resultado: Posição do resultado no array `results`
+
+    Returns:
+        dict do dataset com as chaves PH, ValueDicts, RT, etc.
+    """
+    return data["results"][indice_resultado]["result"]["data"]["dsr"]["DS"][0]
+
+
+def obter_restart_tokens(data: dict, indice_resultado: int = 0) -> list | None:
+    """
+    Retorna os RestartTokens (`RT`) de uma resposta, presentes quando há mais páginas
+
+    Returns:
+        Lista de tokens para a próxima página ou None se o resultado está completo
+    """
+    try:
+        return obter_dataset(data, indice_resultado).get("RT")
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+CAMINHO_JANELA = (
+    "Query",
+    "Commands",
+    0,
+    "SemanticQueryDataShapeCommand",
+    "Binding",
+    "DataReduction",
+    "Primary",
+    "Window",
+)
+"""Caminho do nó Window a partir de cada item do array `queries`"""
+
+
+def obter_janela(payload: dict, indice_consulta: int = 0) -> dict | None:
+    """
+    Retorna o nó `DataReduction.Primary.Window` de uma consulta do payload
+
+    Returns:
+        dict da janela (Count/RestartTokens) ou None se a consulta não é paginada (ex: `Top`)
+    """
+    comando = payload["queries"][indice_consulta]["Query"]["Commands"][0]["SemanticQueryDataShapeCommand"]
+    return comando["Binding"].get("DataReduction", {}).get("Primary", {}).get("Window")
+
+
+def com_janela(payload: dict, janela: dict, indice_consulta: int = 0) -> dict:
+    """
+    Retorna uma cópia do payload com o nó Window da consulta substituído, sem alterar o original
+
+    Args:
+        payload: Payload de origem (pode compartilhar nós com um template)
+        janela: Novo nó Window (ex: {"Count": 500, "RestartTokens": [...]})
+        indice_consulta: Posição da consulta no array `queries`
+    """
+    return substituir(payload, ("queries", indice_consulta) + CAMINHO_JANELA, janela)
+
+
+def decodificar_dataset(dataset: dict) -> tuple[list[str], dict[str, list]]:
+    """
+    Reconstrói as linhas compactadas de um dataset DSR em formato colunar
+
+    * `S` (schema) define as colunas e, via `DN`, o dicionário de valores de cada uma
+    * `R` marca as colunas repetidas da linha anterior (não aparecem em `C`)
+    * `Ø` marca as colunas nulas (não aparecem em `C`)
+    * Valores inteiros em colunas com `DN` são índices em `ValueDicts`
+
+    Args:
+        dataset: Dataset retornado por `obter_dataset`
+
+    Returns:
+        Tupla (nomes das colunas na ordem do schema, dict nome -> lista de valores)
+    """
+    dicionarios = dataset.get("ValueDicts", {})
+    linhas = dataset["PH"][0].get("DM0", []) if dataset.get("PH") else []
+
+    nomes: list[str] = []
+    colunas: dict[str, list] = {}
+    schema: list[dict] = []
+    lookups: list[list | None] = []
+    ausentes: list[str] = []
+    anterior: list = []
+    total = 0
+
+    for linha in linhas:
+        if "S" in linha:
+            schema = linha["S"]
+            lookups = [dicionarios.get(coluna["DN"]) if "DN" in coluna else None for coluna in schema]
+            for coluna in schema:
+                if coluna["N"] not in colunas:
+                    # Colunas novas recebem None nas linhas já decodificadas
+                    nomes.append(coluna["N"])
+                    colunas[coluna["N"]] = [None] * total
+            nomes_schema = {coluna["N"] for coluna in schema}
+            ausentes = [nome for nome in nomes if nome not in nomes_schema]
+            anterior = [None] * len(schema)
+
+        if "C" in linha:
+            valores = linha["C"]
+        else:
+            # Linhas sem compactação trazem os valores nomeados (ex: {"M0": "08/01/2026"})
+            valores = [linha[coluna["N"]] for coluna in schema if coluna["N"] in linha]
+
+        repeticao = linha.get(BIT_REPETICAO, 0)
+        nulos = linha.get(BIT_NULO, 0)
+
+        atual = []
+        posicao = 0
+        for i, lookup in enumerate(lookups):
+            bit = 1 << i
+            if repeticao & bit:
+                valor = anterior[i]
+            elif nulos & bit:
+                valor = None
+            else:
+                valor = valores[posicao]
+                posicao += 1
+                if lookup is not None and isinstance(valor, int):
+                    valor = lookup[valor]
+            atual.append(valor)
+
+        for coluna, valor in zip(schema, atual):
+            colunas[coluna["N"]].append(valor)
+        for nome in ausentes:
+            colunas[nome].append(None)
+        anterior = atual
+        total += 1
+
+    return nomes, colunas
@@ -0,0 +1,177 @@
+"""
+Esperas orientadas a eventos do navegador (DOM e rede) para a automação do Saiku
+
+Substituem os `time.sleep` fixos: cada espera termina assim que a condição é satisfeita,
+verificada em intervalos curtos, e sua duração é registrada por etapa nas métricas.
+"""
+
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .metricas import METRICAS
+
+ESPERA = "hermes_pentaho_espera_segundos"
+AJUDA_ESPERA = "Duração das esperas por condição do navegador"
+
+INTERVALO_PADRAO = 0.1
+"""Intervalo (s) entre verificações das condições"""
+
+SCRIPT_MONITOR = """
+if (!window.__hermes) {
+    const estado = {requisicoes: 0, iniciadas: 0, ultimaMutacao: performance.now(), ultimaRede: performance.now()};
+    window.__hermes = estado;
+
+    new MutationObserver(() => { estado.ultimaMutacao = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    const enviar = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        estado.requisicoes++;
+        estado.iniciadas++;
+        this.addEventListener("loadend", () => { estado.requisicoes--; estado.ultimaRede = performance.now(); });
+        return enviar.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        const buscar = window.fetch;
+        window.fetch = function () {
+            estado.requisicoes++;
+            estado.iniciadas++;
+            return buscar.apply(this, arguments).finally(() => {
+                estado.requisicoes--;
+                estado.ultimaRede = performance.now();
+            });
+        };
+    }
+}
+const estado = window.__hermes;
+const agora = performance.now();
+return [
+    estado.requisicoes, (agora - estado.ultimaMutacao) / 1000, (agora - estado.ultimaRede) / 1000, estado.iniciadas
+];
+"""
+"""Instala (uma vez por página) o observador de mutações e o contador de requisições XHR/fetch e retorna
+[requisições ativas, segundos desde a última mutação, segundos desde a última resposta,
+requisições iniciadas]"""
+
+
+class Esperas:
+    """
+    Camada de espera sobre um WebDriver
+
+    Exemplo:
+        esperas = Esperas(driver)
+        esperas.clicavel(By.ID, "run_icon", etapa="executar").click()
+        esperas.rede_ociosa(etapa="consulta")
+    """
+
+    def __init__(self, driver, timeout: float = 10, intervalo: float = INTERVALO_PADRAO):
+        """
+        Args:
+            driver: WebDriver do Selenium
+            timeout: Timeout padrão (s) de cada espera
+            intervalo: Intervalo (s) entre verificações
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.intervalo = intervalo
+
+    def ate(self, condicao, etapa: str, timeout: float | None = None, mensagem: str = ""):
+        """
+        Aguarda até `condicao(driver)` retornar um valor verdadeiro e registra a duração
+
+        Returns:
+            Valor retornado pela condição
+
+        Raises:
+            TimeoutException: Se a condição não for satisfeita dentro do timeout
+        """
+        inicio = time.perf_counter()
+        resultado = "ok"
+        try:
+            espera = WebDriverWait(
+                self.driver,
+                self.timeout if timeout is None else timeout,
+                poll_frequency=self.intervalo,
+                ignored_exceptions=(StaleElementReferenceException,),
+            )
+            return espera.until(condicao, mensagem)
+        except TimeoutException:
+            resultado = "timeout"
+            raise
+        finally:
+            METRICAS.observar(ESPERA, time.perf_counter() - inicio, AJUDA_ESPERA, etapa=etapa, resultado=resultado)
+
+    def estado(self) -> tuple[int, float, float]:
+        """(requisições ativas, segundos sem mutação no DOM, segundos sem resposta de rede)"""
+        requisicoes, sem_mutacao, sem_rede, _ = self.driver.execute_script(SCRIPT_MONITOR)
+        return int(requisicoes), float(sem_mutacao), float(sem_rede)
+
+    def iniciadas(self) -> int:
+        """Total de requisições XHR/fetch iniciadas na página desde a instalação do monitor"""
+        return int(self.driver.execute_script(SCRIPT_MONITOR)[3])
+
+    def instalar_monitor(self):
+        """Instala o monitor de DOM/rede na página atual (necessário após cada `driver.get`)"""
+        self.estado()
+
+    def rede_ociosa(self, etapa: str, quieto: float = 0.25, timeout: float | None = None):
+        """Aguarda nenhuma requisição XHR/fetch ativa há pelo menos `quieto` segundos"""
+
+        def ociosa(driver):
+            requisicoes, _, sem_rede = self.estado()
+            return requisicoes == 0 and sem_rede >= quieto
+
+        return self.ate(ociosa, etapa, timeout, "rede ainda ativa")
+
+    def requisicao_iniciada(self, anteriores: int, etapa: str, timeout: float | None = None):
+        """
+        Aguarda uma requisição nova (total iniciado acima de `anteriores`, lido antes do clique)
+
+        Sem isso, `rede_ociosa` logo após um clique pode ser satisfeita antes de a requisição sair.
+        """
+
+        def iniciou(driver):
+            return self.iniciadas() > anteriores
+
+        return self.ate(iniciou, etapa, timeout, "requisição não iniciada")
+
+    def dom_estavel(self, etapa: str, quieto: float = 0.2, timeout: float | None = None):
+        """Aguarda o DOM sem mutações há pelo menos `quieto` segundos"""
+
+        def estavel(driver):
+            _, sem_mutacao, _ = self.estado()
+            return sem_mutacao >= quieto
+
+        return self.ate(estavel, etapa, timeout, "DOM ainda mudando")
+
+    def pagina_pronta(self, etapa: str, quieto: float = 0.25, timeout: float | None = None):
+        """Aguarda rede ociosa e DOM estável ao mesmo tempo"""
+
+        def pronta(driver):
+            requisicoes, sem_mutacao, sem_rede = self.estado()
+            return requisicoes == 0 and sem_rede >= quieto and sem_mutacao >= quieto
+
+        return self.ate(pronta, etapa, timeout, "página ainda carregando")
+
+    def clicavel(self, by: str, seletor: str, etapa: str, timeout: float | None = None):
+        """Aguarda e retorna um elemento visível e habilitado"""
+        return self.ate(EC.element_to_be_clickable((by, seletor)), etapa, timeout, f"{seletor} não clicável")
+
+    def presentes(self, by: str, seletor: str, etapa: str, timeout: float | None = None):
+        """Aguarda e retorna todos os elementos do seletor (ao menos um)"""
+        return self.ate(EC.presence_of_all_elements_located((by, seletor)), etapa, timeout, f"{seletor} ausente")
+
+    def invisivel(self, by: str, seletor: str, etapa: str, timeout: float | None = None):
+        """Aguarda todos os elementos do seletor ficarem ocultos ou saírem do DOM"""
+
+        def oculto(driver):
+            try:
+                return not any(elemento.is_displayed() for elemento in driver.find_elements(by, seletor))
+            except WebDriverException:
+                return False
+
+        return self.ate(oculto, etapa, timeout, f"{seletor} ainda visível")
@@ -0,0 +1,119 @@
+"""
+Esquemas de tipos compactos dos DataFrames extraídos
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from .calendario import MESES
+
+TIPO_MES = CategoricalDtype(MESES, ordered=True)
+"""Mês abreviado como categoria ordenada (ordena cronologicamente)"""
+
+ESQUEMA_IGR = {
+    "Operadora": "category",
+    "Média de reclamações": "float32",
+    "Média de beneficiários": "Int32",
+    "IGR": "float32",
+    "Posição OPS mesmo porte": "Int32",
+    "Posição geral Setor": "Int32",
+    "Mês": TIPO_MES,
+    "Ano": "category",
+    "Tipo Plano": "category",
+    "Porte": "category",
+    "data_atualizacao": "datetime64[ns]",
+}
+"""Tipos das colunas do DataFrame de IGR"""
+
+DIMENSOES_PENTAHO = ["Registro", "Razao Social", "Cobertura Assistencial", "UF", "Nome  do municipio"]
+"""Níveis do cubo colocados nas linhas da consulta do Saiku, na ordem das colunas"""
+
+COLUNAS_CATEGORICAS_PENTAHO = DIMENSOES_PENTAHO + ["Cubo"]
+"""Colunas de texto repetitivo do DataFrame do Pentaho"""
+
+
+def serie_numerica(valores, dtype: str, casas: int | None = None) -> pd.Series:
+    """
+    Converte uma lista de valores (números ou textos numéricos) já no tipo final
+
+    Args:
+        valores: Lista de valores; inválidos viram nulo
+        dtype: Tipo final (ex: "float32", "Int32"); em tipos inteiros a parte fracionária é truncada
+        casas: Casas decimais para arredondamento (antes da conversão)
+    """
+    serie = pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce")
+    if casas is not None:
+        serie = serie.round(casas)
+    elif pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtype)):
+        # Como o int() original: uma média fracionária (ex: beneficiários) é truncada em vez de falhar no astype
+        serie = np.trunc(serie)
+    return serie.astype(dtype)
+
+
+def coluna_constante(valor, tamanho: int, dtype=None):
+    """
+    Coluna com o mesmo valor em todas as linhas, montada diretamente como categoria
+
+    Args:
+        valor: Valor repetido
+        tamanho: Quantidade de linhas
+        dtype: CategoricalDtype com categorias fixas (padrão: categoria única `valor`)
+    """
+    if dtype is None:
+        dtype = CategoricalDtype([valor])
+    codigo = dtype.categories.get_loc(valor)
+    return pd.Categorical.from_codes(np.full(tamanho, codigo, dtype=np.int8), dtype=dtype)
+
+
+def converter_data(data: str | None) -> pd.Timestamp:
+    """Converte a data de atualização do relatório (dd/mm/aaaa) em Timestamp (NaT se ausente)"""
+    return pd.to_datetime(data, format="%d/%m/%Y", errors="coerce")
+
+
+def concatenar(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena DataFrames preservando as colunas categóricas
+
+    `pd.concat` converte para object as categorias com conjuntos diferentes; aqui as
+    categorias de cada coluna são unidas antes da concatenação.
+    """
+    if len(dfs) == 1:
+        return dfs[0]
+
+    tipos_por_coluna: dict[str, list[CategoricalDtype]] = {}
+    for df in dfs:
+        for coluna in df.select_dtypes("category").columns:
+            tipos_por_coluna.setdefault(coluna, []).append(df[coluna].dtype)
+
+    tipos = {}
+    for coluna, dtypes in tipos_por_coluna.items():
+        categorias = dtypes[0].categories.append([dtype.categories for dtype in dtypes[1:]]).unique()
+        tipos[coluna] = CategoricalDtype(categorias, ordered=all(dtype.ordered for dtype in dtypes))
+
+    alinhados = [
+        df.astype({coluna: tipo for coluna, tipo in tipos.items() if coluna in df.columns}) if tipos else df
+        for df in dfs
+    ]
+    return pd.concat(alinhados, ignore_index=True)
+
+
+def compactar_pentaho(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica tipos compactos ao DataFrame capturado do Saiku
+
+    * Colunas de texto repetitivo viram categoria
+    * Medidas numéricas são reduzidas (int32/float32)
+    """
+    for coluna in df.columns:
+        if coluna in COLUNAS_CATEGORICAS_PENTAHO:
+            df[coluna] = df[coluna].astype("category")
+        elif pd.api.types.is_integer_dtype(df[coluna]):
+            df[coluna] = pd.to_numeric(df[coluna], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[coluna]):
+            valores = df[coluna]
+            if valores.notna().all() and (valores % 1 == 0).all():
+                df[coluna] = pd.to_numeric(valores, downcast="integer")
+            else:
+                df[coluna] = valores.astype("float32")
+    return df
@@ -1,15 +1,167 @@
+from __future__ import annotations
+
 import json
 import logging
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice, product
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
 
-import pandas as pd
 import requests
 
+from .cache_respostas import CacheRespostas
+from .calendario import MESES
+from .dsr import com_janela, decodificar_dataset, obter_dataset, obter_janela, obter_restart_tokens
+from .limitador import STATUS_SOBRECARGA, LimitadorAdaptativo
+from .metricas import BUCKETS_BYTES, METRICAS
+from .sessao_http import SessaoHTTP
+from .templates import TemplatePayload
+
+# pandas (e os esquemas que dependem dele) só é importado ao montar DataFrames:
+# a consulta da data de atualização não paga esse custo na inicialização
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .diario import DiarioExecucao
+
+
+URL_QUERYDATA = "https://wabi-brazil-south-api.analysis.windows.net/public/reports/querydata?synchronous=true"
+
+HEADERS_PBI = {
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Encoding": "gzip, deflate, br, zstd",
+    "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+    "ActivityId": "6577f9b3-cad2-9709-cf9f-f94a06ea196f",
+    "Content-Type": "application/json;charset=UTF-8",
+    "Origin": "https://app.powerbi.com",
+    "Referer": "https://app.powerbi.com/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
+    "X-PowerBI-ResourceKey": "bbc980b5-ae6a-4183-afc3-60412a47caa3",
+}
+
+COLUNAS_IGR = [
+    "Operadora",
+    "Média de reclamações",
+    "Média de beneficiários",
+    "IGR",
+    "Posição OPS mesmo porte",
+    "Posição geral Setor",
+]
+"""Colunas do DataFrame de IGR, na ordem das projeções de payload_igr.json"""
+
+ANOS_IGR = ["2025"]
+"""Anos da grade fixa; com a descoberta de dimensões, o menor deles é o ano inicial da grade"""
+MESES_IGR = MESES
+TIPOS_PLANO_IGR = ["Médico-hospitalar", "Exclusivamente odontológica"]
+PORTES_IGR = ["Grande Porte", "Médio Porte", "Pequeno Porte"]
+
+CAMINHO_DIMENSOES = Path("cache") / "dimensoes_igr.json"
+"""Combinações existentes no relatório, guardadas por data de atualização"""
+
+INTERVALO_CANCELAMENTO = 0.2
+"""Intervalo (s) entre as verificações de cancelamento enquanto aguarda um lote do IGR"""
+
+LIMITADOR_PBI = LimitadorAdaptativo(
+    limite_inicial=float(os.getenv("HERMES_PBI_CONCORRENCIA_INICIAL", "4")),
+    limite_maximo=float(os.getenv("HERMES_PBI_CONCORRENCIA_MAXIMA", "32")),
+    taxa_maxima=float(os.getenv("HERMES_PBI_TAXA_MAXIMA", "200")),
+)
+"""Limitador adaptativo do endpoint querydata, compartilhado por todos os ExtratorPBI do processo"""
+
+
+class FalhaExtracao(RuntimeError):
+    """Consulta ao querydata sem resposta válida após as retentativas (diferente de uma consulta sem dados)"""
+
+
+def periodos_revisaveis(
+    ultimo_periodo: tuple[str, str], quantidade: int = 3, sincronizado: tuple[str, str] | None = None
+) -> list[tuple[str, str]]:
+    """
+    Retorna os meses (ano, mês) a extrair novamente até o último período publicado, inclusive
+
+    São os últimos `quantidade` meses, cujo IGR ainda pode ser revisado pela ANS, mais os meses
+    publicados depois do último período já sincronizado (ex: serviço parado enquanto vários meses
+    foram divulgados). A contagem parte do último mês publicado (ver `ExtratorPBI.ultimo_periodo_publicado`),
+    e não do mês da data de atualização, que normalmente ainda não foi divulgado.
+
+    Args:
+        ultimo_periodo: Último (ano, mês) publicado no relatório
+        quantidade: Quantidade de meses revisáveis
+        sincronizado: Último (ano, mês) já extraído (ver `Watermark.ler_periodo`)
+
+    Returns:
+        Lista de tuplas (ano, mês) em ordem cronológica
+    """
+    fim = indice_periodo(ultimo_periodo)
+    inicio = fim - quantidade + 1
+    if sincronizado is not None:
+        inicio = min(inicio, indice_periodo(sincronizado) + 1)
+    return [(str(i // 12), MESES_IGR[i % 12]) for i in range(inicio, fim + 1)]
+
+
+def indice_periodo(periodo: tuple[str, str]) -> int:
+    """Posição cronológica de (ano, mês) em meses, para comparar e percorrer períodos"""
+    ano, mes = periodo
+    return int(ano) * 12 + MESES_IGR.index(mes)
+
 
 class ExtratorPBI:
-    def __init__(self, logger: logging.Logger):
+    def __init__(
+        self,
+        logger: logging.Logger,
+        max_workers: int = 8,
+        tamanho_pagina: int = 500,
+        tamanho_lote: int = 1,
+        cache: CacheRespostas | None = None,
+        usar_cache: bool = True,
+        url: str = URL_QUERYDATA,
+        descobrir_dimensoes: bool = True,
+        caminho_dimensoes: str | Path = CAMINHO_DIMENSOES,
+        diario: DiarioExecucao | None = None,
+        limitador: LimitadorAdaptativo | None = LIMITADOR_PBI,
+    ):
+        """
+        Args:
+            logger: Logger da aplicação
+            max_workers: Máximo de requisições simultâneas na extração do IGR (1 = sequencial)
+            tamanho_pagina: Linhas por página (Window.Count) nas consultas paginadas
+            tamanho_lote: Combinações da grade enviadas por requisição (1 = uma consulta por requisição)
+            cache: Cache de respostas; padrão é o cache local configurado por HERMES_CACHE_TTL/HERMES_CACHE_MB
+            usar_cache: False ignora o cache (nem lê nem grava)
+            url: Endpoint querydata (ex: servidor local de benchmark)
+            descobrir_dimensoes: True monta a grade apenas com as combinações publicadas no relatório
+            caminho_dimensoes: Arquivo com as combinações descobertas por data de atualização
+            diario: Diário de execução; com ele a grade de IGR é retomada do ponto em que parou
+            limitador: Limitador de concorrência/taxa do endpoint (None desativa); padrão compartilhado LIMITADOR_PBI
+        """
         self.logger = logger
+        self.max_workers = max(1, int(max_workers))
+        self.tamanho_pagina = max(1, int(tamanho_pagina))
+        self.tamanho_lote = max(1, int(tamanho_lote))
+        self.url = url
+        self.descobrir_dimensoes = descobrir_dimensoes
+        self.caminho_dimensoes = Path(caminho_dimensoes)
+        self.diario = diario
+
+        # Busca antecipada da próxima página enquanto a atual é decodificada
+        self._executor_paginas = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pagina")
+
+        # Sessão HTTP compartilhada: reaproveita conexões entre as requisições e repete falhas transitórias
+        # O limitador ajusta a concorrência efetiva ao que o servidor tolera (max_workers é apenas o teto local)
+        self.sessao = SessaoHTTP(logger, headers=HEADERS_PBI, pool_maxsize=self.max_workers, limitador=limitador)
+
+        # Cache local de respostas: evita repetir na rede consultas idênticas entre CLI, app e agendador
+        if usar_cache and cache is None:
+            cache = CacheRespostas(
+                ttl=float(os.getenv("HERMES_CACHE_TTL", str(6 * 3600))),
+                tamanho_maximo=int(os.getenv("HERMES_CACHE_MB", "256")) * 1024 * 1024,
+            )
+        self.cache = cache if usar_cache else None
+
         project_root = os.getcwd()
         print(project_root)
         # # Pasta que usamos como delimitador
@@ -18,13 +170,15 @@ class ExtratorPBI:
         # print(project_root)
         # Carregar payload de Data
         payload_path_data = Path(project_root) / "payloads" / "payload_data.json"
-        with open(payload_path_data, "r", encoding="utf-8") as f:
-            self.payload_data = json.load(f)
+        self.payload_data = TemplatePayload.carregar(payload_path_data).preencher()
 
-        # Carregar payload de IGR (template)
+        # Carregar payload de IGR (template compilado uma única vez)
         payload_path_igr = Path(project_root) / "payloads" / "payload_igr.json"
-        with open(payload_path_igr, "r", encoding="utf-8") as f:
-            self.payload_igr_template = f.read()  # Carregar como string para substituição
+        self.template_igr = TemplatePayload.carregar(payload_path_igr)
+
+        # Carregar payload de dimensões (combinações ano/mês/porte/segmentação com dados)
+        payload_path_dimensoes = Path(project_root) / "payloads" / "payload_dimensoes.json"
+        self.payload_dimensoes = TemplatePayload.carregar(payload_path_dimensoes).preencher()
 
     def gerar_payload_igr(self, tipo_plano: str, mes: str, ano: str, porte: str) -> dict:
         """
@@ -39,67 +193,54 @@ class ExtratorPBI:
         Returns:
             dict: Payload pronto para requisição
         """
-        # Substituir placeholders no template
-        payload_str = self.payload_igr_template.replace("{{ANO}}", ano)
-        payload_str = payload_str.replace("{{MES}}", mes)
-        payload_str = payload_str.replace("{{PORTE}}", porte)
-        payload_str = payload_str.replace("{{TIPO_PLANO}}", tipo_plano)
-
-        # Converter string JSON para dicionário
-        return json.loads(payload_str)
+        # Preenche apenas os nós Literal.Value com slots; o restante é compartilhado com o template
+        return self.template_igr.preencher(ANO=ano, MES=mes, PORTE=porte, TIPO_PLANO=tipo_plano)
 
     # * Função para tratamento de dados e exportar dataframe
-    def tratamento_dos_dados(self, data):
+    def tratamento_dos_dados(self, data, indice_resultado: int = 0):
         """
         # Dados extração final
-        * Extrai todos os dados possíveis da tabela
-        * Processa e salva automaticamente
+        * Decodifica o DSR completo (repetições `R`, nulos `Ø` e `ValueDicts`)
+        * Monta o DataFrame coluna a coluna, com conversão vetorizada dos tipos
+        * indice_resultado: posição do resultado em respostas com várias consultas (lote)
         """
 
         if data is not None:
-            # Caminho até o array com os registros
-            registros = data["results"][0]["result"]["data"]["dsr"]["DS"][0]["PH"][0]["DM0"]
-
-            linhas = []
-            for item in registros:
-                c = item["C"]  # lista de valores
-                flag = item.get("R")  # pode não existir
-
-                # Estrutura completa (6 valores) ou parcial (por causa de R)
-                if flag is None:  # registro completo
-                    linha = {
-                        "Operadora": c[0],
-                        "Média de reclamações": float(c[1]),
-                        "Média de beneficiários": int(c[2]),
-                        "IGR": round(float(c[3]), 2),
-                        "Posição OPS mesmo porte": int(c[4]),
-                        "Posição geral Setor": int(c[5]),
-                    }
-                    linhas.append(linha)
-                # else:  # registro com dados faltantes
-                #     linha = {
-                #         "Operadora": c[0],
-                #         "Média de reclamações": 1.0,
-                #         "Média de beneficiários": int(c[1]),
-                #         "IGR": round(float(c[2]), 2),
-                #         "Posição OPS mesmo porte": int(c[3]),
-                #         "Posição geral Setor": int(c[4]),
-                #     }
-                #     linhas.append(linha)
-
-            df = pd.DataFrame(linhas)
+            import pandas as pd
+
+            from .esquemas import ESQUEMA_IGR, serie_numerica
+
+            inicio = time.perf_counter()
+            nomes, colunas = decodificar_dataset(obter_dataset(data, indice_resultado))
+
+            # As 6 primeiras colunas do schema seguem a ordem das projeções do payload IGR,
+            # montadas diretamente nos tipos compactos de ESQUEMA_IGR
+            valores = dict(zip(COLUNAS_IGR, (colunas[nome] for nome in nomes)))
+            linhas = len(next(iter(valores.values()), []))
+            df = pd.DataFrame({"Operadora": pd.Categorical(valores.get("Operadora", [None] * linhas))})
+            for coluna in COLUNAS_IGR[1:]:
+                casas = 2 if coluna == "IGR" else None
+                df[coluna] = serie_numerica(valores.get(coluna, [None] * linhas), ESQUEMA_IGR[coluna], casas)
+
+            METRICAS.observar(
+                "hermes_pbi_decodificacao_segundos", time.perf_counter() - inicio, "Tempo de decodificação do DSR"
+            )
+            METRICAS.incrementar("hermes_pbi_linhas_decodificadas_total", len(df), "Linhas decodificadas do DSR")
             return df
         else:
             self.logger.error("\n❌ Falha na extração final")
             return None
 
-    def extrair_dados(self, option: str):
+    def extrair_dados(self, option: str, periodos: list[tuple[str, str]] | None = None, data_atualizacao=None):
         """
         Extrai dados de uma tabela do Power BI usando payloads predefinidos.
-        * option: 'testado' para usar o payload testado e funcional.
+        * option: 'Data', 'sample_IGR' ou 'IGR'
+        * periodos: (IGR) lista de (ano, mês) a extrair; padrão ANOS_IGR x MESES_IGR
+        * data_atualizacao: (IGR) data já consultada, evita repetir a consulta de Data
         """
         if option == "Data":
-            data = self.extrair(self.payload_data)
+            # A data de atualização é o gatilho das sincronizações: sempre consultada na rede
+            data = self.extrair(self.payload_data, usar_cache=False)
             if data is not None:
                 # Caminho até o array com os registros
                 registros = data["results"][0]["result"]["data"]["dsr"]["DS"][0]["PH"][0]["DM0"][0]["M0"]
@@ -110,32 +251,16 @@ class ExtratorPBI:
         elif option == "sample_IGR":
 
             # Coluna de data
-            data = self.extrair(self.payload_data)
-            if data is not None:
-                # Caminho até o array com os registros
-                registros = data["results"][0]["result"]["data"]["dsr"]["DS"][0]["PH"][0]["DM0"][0]["M0"]
+            registros = self.extrair_dados("Data")
 
             ano = "2025"
             mes = "jan"  # Apenas 1 mês
             tipo_plano = "Médico-hospitalar"  # Apenas 1 tipo
             porte = "Grande Porte"  # Apenas 1 porte
 
-            dfs = []
-
-            self.logger.info("🔄 Extraindo dados para o mês: %s/%s - %s - %s", mes, ano, porte, tipo_plano)
-            payload = self.gerar_payload_igr(tipo_plano, mes, ano, porte)
-            data = self.extrair(payload)
-            df = self.tratamento_dos_dados(data)
-
-            if df is not None and not df.empty:
-                # * Adicionar colunas de contexto
-                df["Mês"] = mes
-                df["Ano"] = ano
-                df["Tipo Plano"] = tipo_plano
-                df["Porte"] = porte
-
-                df["data_atualizacao"] = registros  # Adiciona a coluna de data
+            df = self.extrair_combinacao(ano, mes, porte, tipo_plano, registros)
 
+            if df is not None:
                 record = df.iloc[0].to_dict()
                 self.logger.info("Registro de amostra obtido")
                 return record
@@ -146,73 +271,517 @@ class ExtratorPBI:
         elif option == "IGR":
 
             # Coluna de data
-            data = self.extrair(self.payload_data)
-            if data is not None:
-                # Caminho até o array com os registros
-                registros = data["results"][0]["result"]["data"]["dsr"]["DS"][0]["PH"][0]["DM0"][0]["M0"]
-
-            anos = ["2025"]
-            lista_mes = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
-            tipos = ["Médico-hospitalar", "Exclusivamente odontológica"]
-            portes = ["Grande Porte", "Médio Porte", "Pequeno Porte"]
-
-            dfs = []
-            for ano in anos:
-                for mes in lista_mes:
-                    for porte in portes:
-                        for tipo_plano in tipos:
-
-                            self.logger.info(
-                                "🔄 Extraindo dados para o mês: %s/%s - %s - %s", mes, ano, porte, tipo_plano
-                            )
-                            payload = self.gerar_payload_igr(tipo_plano, mes, ano, porte)
-                            data = self.extrair(payload)
-                            df = self.tratamento_dos_dados(data)
-
-                            if df is not None and not df.empty:
-                                # * Adicionar colunas de contexto
-                                df["Mês"] = mes
-                                df["Ano"] = ano
-                                df["Tipo Plano"] = tipo_plano
-                                df["Porte"] = porte
-                                df["data_atualizacao"] = registros  # Adiciona a coluna de data
-                                dfs.append(df)
-                            else:
-                                self.logger.warning("❌ Dados vazios para o mês: %s/%s", mes, ano)
-            return pd.concat(dfs, ignore_index=True) if dfs else None
+            registros = data_atualizacao if data_atualizacao is not None else self.extrair_dados("Data")
+            return self.extrair_grade_igr(self.combinacoes_igr(periodos, registros), registros)
 
         # print("❌ Opção inválida. Use 'testado'.")
         return None
 
-    def extrair(self, payload):
+    def extrair_combinacao(
+        self, ano: str, mes: str, porte: str, tipo_plano: str, data_atualizacao
+    ) -> pd.DataFrame | None:
+        """
+        Extrai e trata os dados de IGR de uma única combinação da grade
+
+        Args:
+            ano: Ano (ex: "2025")
+            mes: Nome abreviado do mês (ex: "jan")
+            porte: Porte da operadora (ex: "Grande Porte")
+            tipo_plano: Segmentação do plano (ex: "Médico-hospitalar")
+            data_atualizacao: Data de atualização do relatório, replicada em cada linha
+
+        Returns:
+            DataFrame com as colunas de contexto ou None se não houver dados
+
+        Raises:
+            FalhaExtracao: Se alguma página falhar (a combinação não é entregue pela metade)
+        """
+        self.logger.info("🔄 Extraindo dados para o mês: %s/%s - %s - %s", mes, ano, porte, tipo_plano)
+        inicio = time.perf_counter()
+        payload = self.gerar_payload_igr(tipo_plano, mes, ano, porte)
+        paginas = [self.tratamento_dos_dados(data) for data in self.extrair_paginas(payload, versao=data_atualizacao)]
+        paginas = [df for df in paginas if df is not None and not df.empty]
+
+        df = None
+        if paginas:
+            from .esquemas import concatenar
+
+            df = concatenar(paginas)
+        return self._finalizar_combinacao(df, (ano, mes, porte, tipo_plano), data_atualizacao, inicio)
+
+    def _finalizar_combinacao(
+        self, df: pd.DataFrame | None, combinacao: tuple, data_atualizacao, inicio: float
+    ) -> pd.DataFrame | None:
+        """Adiciona o contexto ao resultado de uma combinação e registra suas métricas"""
+        ano, mes, porte, tipo_plano = combinacao
+        rotulos = {"ano": ano, "mes": mes, "porte": porte, "tipo_plano": tipo_plano}
+        METRICAS.observar(
+            "hermes_pbi_combinacao_segundos", time.perf_counter() - inicio, "Tempo por combinação da grade", **rotulos
+        )
+
+        if df is None or df.empty:
+            self.logger.warning("❌ Dados vazios para o mês: %s/%s", mes, ano)
+            METRICAS.incrementar("hermes_pbi_combinacao_vazia_total", 1, "Combinações sem dados", **rotulos)
+            return None
+
+        METRICAS.incrementar("hermes_pbi_combinacao_linhas_total", len(df), "Linhas por combinação", **rotulos)
+        return self._adicionar_contexto(df, ano, mes, porte, tipo_plano, data_atualizacao)
+
+    def _adicionar_contexto(self, df: pd.DataFrame, ano, mes, porte, tipo_plano, data_atualizacao) -> pd.DataFrame:
+        # * Adicionar colunas de contexto (categorias de valor único, sem repetir strings por linha)
+        from .esquemas import TIPO_MES, coluna_constante, converter_data
+
+        linhas = len(df)
+        df["Mês"] = coluna_constante(mes, linhas, TIPO_MES)
+        df["Ano"] = coluna_constante(ano, linhas)
+        df["Tipo Plano"] = coluna_constante(tipo_plano, linhas)
+        df["Porte"] = coluna_constante(porte, linhas)
+        df["data_atualizacao"] = converter_data(data_atualizacao)  # Adiciona a coluna de data
+        return df
+
+    def gerar_payload_lote(self, payloads: list[dict]) -> dict:
+        """
+        Agrupa as consultas de vários payloads em um único payload (array `queries`)
+
+        Args:
+            payloads: Payloads com uma consulta cada, gerados por `gerar_payload_igr`
+
+        Returns:
+            dict: Payload com uma consulta por combinação, na mesma ordem
+        """
+        return {**payloads[0], "queries": [payload["queries"][0] for payload in payloads]}
+
+    def extrair_lote(
+        self, combinacoes: list[tuple[str, str, str, str]], data_atualizacao
+    ) -> list[pd.DataFrame | None]:
+        """
+        Extrai várias combinações da grade em uma única requisição e separa a resposta por combinação
+
+        Combinações cujo resultado veio paginado (`RT`) ou com erro são refeitas individualmente
+        via `extrair_combinacao`, que segue a paginação completa.
+
+        Args:
+            combinacoes: Lista de tuplas (ano, mes, porte, tipo_plano)
+            data_atualizacao: Data de atualização do relatório
+
+        Returns:
+            Lista de DataFrames (ou None), na ordem das combinações
+        """
+        if len(combinacoes) == 1:
+            return [self.extrair_combinacao(*combinacoes[0], data_atualizacao)]
+
+        self.logger.info("🔄 Extraindo lote de %s combinações: %s ...", len(combinacoes), combinacoes[0])
+        payloads = [self.gerar_payload_igr(tipo_plano, mes, ano, porte) for ano, mes, porte, tipo_plano in combinacoes]
+        payloads = [
+            com_janela(payload, {"Count": self.tamanho_pagina}) if obter_janela(payload) is not None else payload
+            for payload in payloads
+        ]
+
+        inicio = time.perf_counter()
+        data = self.extrair(self.gerar_payload_lote(payloads), versao=data_atualizacao)
+        resultados = data["results"] if data is not None else []
+
+        dfs = []
+        for indice, combinacao in enumerate(combinacoes):
+            try:
+                completo = indice < len(resultados) and not obter_restart_tokens(data, indice)
+                df = self.tratamento_dos_dados(data, indice) if completo else None
+            except (KeyError, IndexError, TypeError):
+                completo, df = False, None
+
+            if not completo:
+                # Resultado ausente, com erro ou paginado: refaz a combinação isoladamente
+                dfs.append(self.extrair_combinacao(*combinacao, data_atualizacao))
+            else:
+                dfs.append(self._finalizar_combinacao(df, combinacao, data_atualizacao, inicio))
+        return dfs
+
+    def combinacoes_igr(
+        self, periodos: list[tuple[str, str]] | None = None, data_atualizacao=None
+    ) -> list[tuple[str, str, str, str]]:
+        """
+        Monta a grade (ano, mes, porte, tipo_plano) a extrair
+
+        Com `descobrir_dimensoes`, a grade é filtrada pelas combinações publicadas no relatório
+        (sem requisições para meses ainda não divulgados) e, sem `periodos`, vai do menor ano de
+        ANOS_IGR até o último mês publicado. Se a descoberta falhar, usa a grade fixa.
+
+        Args:
+            periodos: Lista de (ano, mês); padrão ANOS_IGR x MESES_IGR
+            data_atualizacao: Data de atualização do relatório (chave das dimensões descobertas)
+        """
+        existentes = self.descobrir_combinacoes(data_atualizacao) if self.descobrir_dimensoes else None
+
+        if periodos is None:
+            anos = ANOS_IGR
+            if existentes:
+                ultimo_ano = max(int(ano) for ano, _, _, _ in existentes)
+                anos = [str(ano) for ano in range(int(min(ANOS_IGR)), ultimo_ano + 1)]
+            periodos = list(product(anos, MESES_IGR))
+
+        combinacoes = [
+            (ano, mes, porte, tipo_plano)
+            for ano, mes in periodos
+            for porte, tipo_plano in product(PORTES_IGR, TIPOS_PLANO_IGR)
+        ]
+        if existentes:
+            combinacoes = [combinacao for combinacao in combinacoes if combinacao in existentes]
+        return combinacoes
+
+    def descobrir_combinacoes(self, data_atualizacao=None) -> set[tuple[str, str, str, str]] | None:
+        """
+        Consulta as combinações (ano, mês, porte, tipo_plano) com dados no relatório
+
+        Uma única consulta agrupada por Ano, Nome do Mês, Porte e Segmentação do Plano
+        (payload_dimensoes.json) substitui as requisições vazias da grade fixa. O resultado é
+        guardado em `caminho_dimensoes` e reaproveitado enquanto a data de atualização não mudar.
+
+        Args:
+            data_atualizacao: Data de atualização do relatório (sem ela, o resultado não é guardado)
+
+        Returns:
+            Conjunto de combinações existentes ou None se a consulta falhar
+        """
+        if data_atualizacao is not None and self.caminho_dimensoes.exists():
+            try:
+                with open(self.caminho_dimensoes, "r", encoding="utf-8") as f:
+                    guardado = json.load(f)
+                if guardado.get("data_atualizacao") == data_atualizacao:
+                    return {tuple(combinacao) for combinacao in guardado["combinacoes"]}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.logger.warning("⚠️ Dimensões guardadas ilegíveis, consultando novamente: %s", str(e))
+
+        existentes = set()
+        try:
+            for data in self.extrair_paginas(self.payload_dimensoes, usar_cache=False):
+                nomes, colunas = decodificar_dataset(obter_dataset(data))
+                anos, meses, portes, tipos_plano = (colunas[nome] for nome in nomes[:4])
+                existentes.update(
+                    (str(int(ano)), mes, porte, tipo_plano)
+                    for ano, mes, porte, tipo_plano in zip(anos, meses, portes, tipos_plano)
+                    if None not in (ano, mes, porte, tipo_plano)
+                )
+        except (FalhaExtracao, KeyError, IndexError, TypeError, ValueError) as e:
+            self.logger.error("❌ Falha ao interpretar as dimensões do relatório: %s", str(e))
+            existentes = set()
+
+        if not existentes:
+            self.logger.warning("⚠️ Dimensões não descobertas, usando a grade fixa")
+            return None
+
+        self.logger.info("🧭 %s combinações publicadas no relatório", len(existentes))
+        if data_atualizacao is not None:
+            self.caminho_dimensoes.parent.mkdir(parents=True, exist_ok=True)
+            temporario = self.caminho_dimensoes.with_suffix(".tmp")
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"data_atualizacao": data_atualizacao, "combinacoes": sorted(existentes)}, f, ensure_ascii=False
+                )
+            os.replace(temporario, self.caminho_dimensoes)
+        return existentes
+
+    def ultimo_periodo_publicado(self, data_atualizacao=None) -> tuple[str, str] | None:
+        """
+        Último (ano, mês) com dados no relatório, a partir das combinações descobertas
+
+        Returns:
+            Tupla (ano, mês) ou None se a descoberta de dimensões falhar
+        """
+        existentes = self.descobrir_combinacoes(data_atualizacao)
+        periodos = {(ano, mes) for ano, mes, _, _ in existentes or () if mes in MESES_IGR}
+        if not periodos:
+            return None
+        return max(periodos, key=indice_periodo)
+
+    def iter_igr(
+        self,
+        periodos: list[tuple[str, str]] | None = None,
+        data_atualizacao=None,
+        ordenado: bool = False,
+        progresso: Callable[[int, int, int], None] | None = None,
+        cancelar: threading.Event | None = None,
+    ):
+        """
+        Extrai o IGR como um gerador, entregando cada combinação assim que é decodificada
+
+        Permite que destinos (CSV, Parquet, banco) consumam o resultado incrementalmente,
+        sem manter a grade inteira em memória. Interromper o gerador (break/close) cancela
+        as requisições ainda não iniciadas.
+
+        Args:
+            periodos: Lista de (ano, mês); padrão ANOS_IGR x MESES_IGR
+            data_atualizacao: Data de atualização já consultada (evita nova consulta)
+            ordenado: True entrega na ordem da grade; False na ordem de conclusão
+            progresso: Chamada a cada lote com (combinações concluídas, total, linhas até agora)
+            cancelar: Evento que, quando sinalizado, encerra o gerador e descarta os lotes não iniciados
+
+        Yields:
+            DataFrame de cada combinação com dados, com as colunas de contexto
+        """
+        if data_atualizacao is None:
+            data_atualizacao = self.extrair_dados("Data")
+        combinacoes = self.combinacoes_igr(periodos, data_atualizacao)
+        yield from self.iter_grade_igr(combinacoes, data_atualizacao, ordenado, progresso, cancelar)
+
+    def iter_grade_igr(
+        self,
+        combinacoes: list[tuple[str, str, str, str]],
+        data_atualizacao,
+        ordenado: bool = False,
+        progresso: Callable[[int, int, int], None] | None = None,
+        cancelar: threading.Event | None = None,
+    ):
+        """
+        Gerador da extração de uma grade de combinações
+
+        As combinações são agrupadas em lotes de `tamanho_lote` consultas por requisição e as
+        requisições são disparadas em paralelo (até `max_workers` simultâneas). No máximo
+        2 x `max_workers` lotes ficam em andamento ou aguardando consumo, o que limita a memória.
+
+        Args:
+            combinacoes: Lista de tuplas (ano, mes, porte, tipo_plano)
+            data_atualizacao: Data de atualização do relatório
+            ordenado: True entrega na ordem das combinações; False na ordem de conclusão
+            progresso: Chamada a cada lote com (combinações concluídas, total, linhas até agora)
+            cancelar: Evento verificado enquanto aguarda cada lote; sinalizado, o gerador termina sem
+                aguardar os lotes em andamento e descarta os não iniciados
+
+        Yields:
+            DataFrame de cada combinação com dados
+
+        Raises:
+            FalhaExtracao: Se algum lote falhar após as retentativas (ou outro erro do lote)
+        """
+        concluidas = linhas = 0
+        for lote, dfs, erro in self._iter_lotes(combinacoes, data_atualizacao, ordenado, cancelar):
+            if erro is not None:
+                raise erro  # Entregar a grade sem o lote esconderia a falha
+            concluidas += len(lote)
+            linhas += sum(len(df) for df in dfs if df is not None)
+            if progresso is not None:
+                progresso(concluidas, len(combinacoes), linhas)
+            yield from (df for df in dfs if df is not None)
+
+    def _iter_lotes(
+        self,
+        combinacoes: list[tuple[str, str, str, str]],
+        data_atualizacao,
+        ordenado: bool,
+        cancelar: threading.Event | None = None,
+    ):
+        """
+        Gerador de (lote, DataFrames do lote, erro) com a execução paralela descrita em `iter_grade_igr`
+
+        Um lote que falha não interrompe os demais: é entregue sem DataFrames e com a exceção em `erro`.
+        Com `cancelar` sinalizado o gerador termina, mesmo se estiver aguardando um lote lento.
+        """
+
+        def cancelado() -> bool:
+            return cancelar is not None and cancelar.is_set()
+
+        lotes = [combinacoes[i : i + self.tamanho_lote] for i in range(0, len(combinacoes), self.tamanho_lote)]
+
+        if self.max_workers == 1:
+            for lote in lotes:
+                if cancelado():
+                    return
+                try:
+                    yield lote, self.extrair_lote(lote, data_atualizacao), None
+                except Exception as e:
+                    yield lote, [], e
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="igr")
+        try:
+            restantes = iter(lotes)
+            pendentes: deque[Future] = deque()
+            lote_do_futuro: dict[Future, list] = {}
+
+            def enviar(lote):
+                futuro = executor.submit(self.extrair_lote, lote, data_atualizacao)
+                lote_do_futuro[futuro] = lote
+                pendentes.append(futuro)
+
+            for lote in islice(restantes, 2 * self.max_workers):
+                enviar(lote)
+
+            while pendentes:
+                # Aguarda em intervalos curtos para perceber o cancelamento durante um lote lento
+                aguardados = [pendentes[0]] if ordenado else pendentes
+                concluidos = set()
+                while not concluidos:
+                    if cancelado():
+                        return
+                    concluidos = wait(aguardados, timeout=INTERVALO_CANCELAMENTO, return_when=FIRST_COMPLETED).done
+                futuro = next(iter(concluidos))
+                pendentes.remove(futuro)
+
+                for lote in islice(restantes, 1):
+                    enviar(lote)
+
+                lote = lote_do_futuro.pop(futuro)
+                try:
+                    dfs, erro = futuro.result(), None
+                except Exception as e:
+                    dfs, erro = [], e
+                yield lote, dfs, erro
+        finally:
+            # Consumidor interrompeu o gerador ou cancelou: descarta os lotes ainda não iniciados.
+            # No cancelamento, as requisições em andamento terminam em segundo plano
+            executor.shutdown(wait=not cancelado(), cancel_futures=True)
+
+    def extrair_grade_igr(
+        self, combinacoes: list[tuple[str, str, str, str]], data_atualizacao
+    ) -> pd.DataFrame | None:
+        """
+        Extrai todas as combinações (ano, mês, porte, tipo_plano) da grade de IGR
+
+        Envoltório de `iter_grade_igr` que concatena o resultado na ordem das combinações,
+        independente da ordem de conclusão das requisições.
+
+        Args:
+            combinacoes: Lista de tuplas (ano, mes, porte, tipo_plano)
+            data_atualizacao: Data de atualização do relatório
+
+        Returns:
+            DataFrame concatenado ou None se nenhuma combinação retornou dados
+        """
+        if self.diario is not None:
+            df = self._extrair_grade_com_diario(combinacoes, data_atualizacao)
+        else:
+            from .esquemas import concatenar
+
+            dfs = list(self.iter_grade_igr(combinacoes, data_atualizacao, ordenado=True))
+            df = concatenar(dfs) if dfs else None
+
+        self.logger.info("📶 Conexões: %s", self.sessao.estatisticas())
+        if self.sessao.limitador is not None:
+            self.logger.info("🚦 Limitador: %s", self.sessao.limitador.estatisticas())
+        if self.cache is not None:
+            self.logger.info("🗄️ Cache: %s", self.cache.estatisticas())
+        self.logger.info("📈 Métricas gravadas em %s", METRICAS.gravar_arquivo())
+
+        return df
+
+    def _extrair_grade_com_diario(
+        self, combinacoes: list[tuple[str, str, str, str]], data_atualizacao
+    ) -> pd.DataFrame | None:
+        """
+        Extrai a grade registrando cada combinação no diário assim que termina
+
+        Em uma nova chamada com a mesma grade e data de atualização (ex: após queda do processo),
+        apenas as combinações não concluídas são extraídas; o resultado é montado uma única vez
+        a partir dos resultados parciais gravados.
+
+        Raises:
+            FalhaExtracao: Se alguma combinação falhar; a execução fica aberta no diário e a
+                próxima chamada extrai apenas as combinações com erro ou pendentes
+        """
+        chaves = {"|".join(combinacao): combinacao for combinacao in combinacoes}
+        execucao = self.diario.iniciar("IGR", data_atualizacao, list(chaves))
+        pendentes = [chaves[chave] for chave in self.diario.pendentes(execucao)]
+        if len(pendentes) < len(combinacoes):
+            self.logger.info(
+                "⏯️ Retomando execução %s: %s de %s combinações pendentes",
+                execucao,
+                len(pendentes),
+                len(combinacoes),
+            )
+
+        for lote, dfs, erro in self._iter_lotes(pendentes, data_atualizacao, ordenado=False):
+            if erro is not None:
+                self.logger.error("❌ Lote %s ... com falha: %s", lote[0], erro)
+                for combinacao in lote:
+                    self.diario.falhar(execucao, "|".join(combinacao), f"{type(erro).__name__}: {erro}")
+                continue
+            for combinacao, df in zip(lote, dfs):
+                self.diario.concluir(execucao, "|".join(combinacao), df)
+
+        falhas = self.diario.pendentes(execucao)
+        if falhas:
+            # Sem finalizar: a execução continua aberta e a próxima chamada refaz só estas combinações
+            raise FalhaExtracao(
+                f"{len(falhas)} de {len(combinacoes)} combinações com falha na execução {execucao}; "
+                "execute novamente para retomar"
+            )
+
+        df = self.diario.resultados(execucao)
+        self.diario.finalizar(execucao)
+        return df
+
+    def extrair_paginas(self, payload: dict, usar_cache: bool = True, versao: str | None = None):
+        """
+        Extrai todas as páginas de uma consulta seguindo os RestartTokens (`RT`) da resposta
+
+        A requisição da página N+1 é disparada assim que a página N chega, em paralelo
+        com a decodificação da página N pelo consumidor do gerador.
+
+        Args:
+            payload: Payload da consulta (a janela `Window` é ajustada para `tamanho_pagina`)
+            usar_cache: False consulta sempre a rede
+            versao: Data de atualização do relatório, parte da chave do cache
+
+        Yields:
+            JSON de resposta de cada página
+
+        Raises:
+            FalhaExtracao: Se qualquer página falhar após as retentativas
+        """
+        paginado = obter_janela(payload) is not None
+        if paginado:
+            payload = com_janela(payload, {"Count": self.tamanho_pagina})
+
+        data = self.extrair(payload, usar_cache, versao)
+        if data is None:
+            # Falha (rede, HTTP, resposta inválida) não é o mesmo que consulta sem dados: quem chama decide
+            raise FalhaExtracao("Falha na página 1: sem resposta válida após as retentativas")
+        pagina = 1
+        while data is not None:
+            proxima = None
+            restart_tokens = obter_restart_tokens(data) if paginado else None
+            if restart_tokens:
+                janela = {"Count": self.tamanho_pagina, "RestartTokens": restart_tokens}
+                proxima = self._executor_paginas.submit(self.extrair, com_janela(payload, janela), usar_cache, versao)
+
+            yield data
+
+            if proxima is None:
+                return
+            data = proxima.result()
+            pagina += 1
+            if data is None:
+                # Entregar as páginas anteriores como resultado completo truncaria a consulta em silêncio
+                raise FalhaExtracao(f"Falha na página {pagina}: resultado incompleto")
+            self.logger.info("📄 Página %s recebida", pagina)
+
+    def extrair(self, payload, usar_cache: bool = True, versao: str | None = None):
         """
         # Extrator usando payload que sabemos que funciona
         * Extrai todos os dados possíveis da tabela
-        * Processa e salva automaticamente
+        * Consulta o cache local antes da rede (usar_cache=False força a rede)
+        * versao: data de atualização do relatório; os payloads não a contêm, então ela entra
+          na chave do cache e, sem ela, a resposta não é lida nem gravada no cache
         """
 
         # logger.info("🚀 Extração com payload...")
 
-        url = "https://wabi-brazil-south-api.analysis.windows.net/public/reports/querydata?synchronous=true"
-
-        headers = {
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Encoding": "gzip, deflate, br, zstd",
-            "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-            "ActivityId": "6577f9b3-cad2-9709-cf9f-f94a06ea196f",
-            "Connection": "keep-alive",
-            "Content-Type": "application/json;charset=UTF-8",
-            "Host": "wabi-brazil-south-api.analysis.windows.net",
-            "Origin": "https://app.powerbi.com",
-            "Referer": "https://app.powerbi.com/",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
-            "X-PowerBI-ResourceKey": "bbc980b5-ae6a-4183-afc3-60412a47caa3",
-        }
+        usar_cache = usar_cache and self.cache is not None and versao is not None
+        if usar_cache:
+            data = self.cache.obter(payload, versao)
+            if data is not None:
+                METRICAS.incrementar("hermes_pbi_requisicoes_total", 1, "Requisições querydata", resultado="cache")
+                return data
 
+        inicio = time.perf_counter()
+        resultado = "erro"
         try:
             # logger.info("⏱️  Fazendo requisição...")
 
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            response = self.sessao.post(self.url, json=payload)
+            resultado = f"http_{response.status_code}"
+            METRICAS.observar(
+                "hermes_pbi_resposta_bytes", len(response.content), "Tamanho das respostas", buckets=BUCKETS_BYTES
+            )
 
             # print(f"📊 Status: {response.status_code}")
 
@@ -223,26 +792,48 @@ class ExtratorPBI:
                 data = response.json()
 
                 if "results" in data and data["results"]:
+                    resultado = "ok"
+                    if usar_cache:
+                        self.cache.gravar(payload, response.content, versao)
                     return data
+                resultado = "vazio"
 
-            self.logger.error("❌ Erro ou sem dados")
+            if response.status_code in STATUS_SOBRECARGA:
+                self.logger.error(
+                    "❌ Servidor limitando requisições (HTTP %s) - tentativas esgotadas", response.status_code
+                )
+            else:
+                self.logger.error("❌ Erro ou sem dados (HTTP %s)", response.status_code)
             return None
 
         except (requests.RequestException, ValueError, KeyError) as e:
             self.logger.error("❌ Erro: %s", str(e))
             return None
 
+        finally:
+            METRICAS.observar(
+                "hermes_pbi_requisicao_segundos",
+                time.perf_counter() - inicio,
+                "Latência das requisições querydata",
+                resultado=resultado,
+            )
+            METRICAS.incrementar("hermes_pbi_requisicoes_total", 1, "Requisições querydata", resultado=resultado)
+
     def data_atualizacao(self):
         """
         Extrai a data de atualização dos dados do Power BI.
         """
         return self.extrair_dados("Data")
 
-    def dados_IGR(self):
+    def dados_IGR(self, periodos: list[tuple[str, str]] | None = None, data_atualizacao=None):
         """
-        Extrai a data de atualização dos dados do Power BI.
+        Extrai os dados de IGR do Power BI.
+
+        Args:
+            periodos: Lista de (ano, mês) a extrair; padrão é a grade completa ANOS_IGR x MESES_IGR
+            data_atualizacao: Data de atualização já consultada (evita nova consulta)
         """
-        return self.extrair_dados("IGR")
+        return self.extrair_dados("IGR", periodos, data_atualizacao)
 
 
 # if __name__ == "__main__":
@@ -1,21 +1,110 @@
 import time
 import logging
+import threading
+from datetime import date
+from typing import Callable
 from venv import logger
 import pandas as pd
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select, WebDriverWait
 
+from .esperas import Esperas
+from .esquemas import DIMENSOES_PENTAHO, coluna_constante, compactar_pentaho, concatenar
+from .extract_pentaho_rest import dividir_em_blocos
+from .metricas import METRICAS
+
+ETAPA = "hermes_pentaho_etapa_segundos"
+AJUDA_ETAPA = "Duração de cada etapa da automação do Saiku"
+
+MAX_MEMBROS_FILTRO = 50
+"""Máximo de operadoras marcadas no filtro de Registro por consulta no modo de consulta única"""
+
+
+class OperadorasNaoEncontradas(LookupError):
+    """Nenhuma operadora do bloco existe no filtro de Registro (bloco concluído, sem dados)"""
+
+
+class ExtracaoIncompleta(RuntimeError):
+    """Blocos de operadoras com falha: o resultado parcial não deve ser gravado como completo"""
+
+SCRIPT_TABELA = """
+const tabela = document.getElementById(arguments[0]);
+if (!tabela) return null;
+const cabecalhos = tabela.tHead ? tabela.tHead.rows : [];
+const corpo = tabela.tBodies.length ? tabela.tBodies[0].rows : [];
+const expandir = (linha) => {
+    const valores = [];
+    for (const celula of linha.cells) {
+        const texto = celula.textContent.replace(/\u00a0/g, " ").trim();
+        for (let i = 0; i < (celula.colSpan || 1); i++) valores.push(texto === "" ? null : texto);
+    }
+    return valores;
+};
+const titulos = cabecalhos.length ? expandir(cabecalhos[cabecalhos.length - 1]) : [];
+const colunas = titulos.map(() => []);
+for (const linha of corpo) {
+    const valores = expandir(linha);
+    for (let j = 0; j < colunas.length; j++) colunas[j].push(j < valores.length ? valores[j] : null);
+}
+return {titulos: titulos, colunas: colunas};
+"""
+"""Lê a tabela do Saiku no navegador em uma única chamada e devolve {titulos, colunas} (listas por coluna)"""
+
+SCRIPT_TABELA_PRONTA = """
+const tabela = document.getElementById(arguments[0]);
+return !!tabela && tabela.offsetParent !== null && tabela.rows.length > 1;
+"""
+"""Tabela visível e com ao menos uma linha além do cabeçalho"""
+
+URL_SAIKU_UI = "https://www.ans.gov.br/pentaho/content/saiku-ui/index.html?biplugin5=true&userid=penanoprod&password=PRDAUpent001"
+
+
+def tabela_para_dataframe(tabela: dict) -> pd.DataFrame:
+    """
+    Converte o resultado de SCRIPT_TABELA no DataFrame da tabela do Saiku
+
+    * Colunas de DIMENSOES_PENTAHO ficam como texto, com as células repetidas (vazias) preenchidas por ffill
+    * Demais colunas são números no formato brasileiro (1.234,5), convertidos de uma vez por coluna
+    """
+    colunas = {}
+    for titulo, valores in zip(tabela["titulos"], tabela["colunas"]):
+        nome, sufixo = titulo or "", 1
+        while nome in colunas:  # Títulos repetidos recebem sufixo, como no pd.read_html
+            nome, sufixo = f"{titulo}.{sufixo}", sufixo + 1
+
+        serie = pd.Series(valores, dtype=object)
+        if titulo in DIMENSOES_PENTAHO:
+            colunas[nome] = serie.ffill()
+        else:
+            numeros = serie.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+            colunas[nome] = pd.to_numeric(numeros, errors="coerce")
+
+    df = pd.DataFrame(colunas)
+    return compactar_pentaho(df)
+
 
 class ExtratorPentaho:
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, headless: bool = False, sessao=None, diario=None):
+        """
+        Args:
+            logger: Logger da aplicação
+            headless: True abre o Chrome sem janela (usado pelos processos do PoolPentaho)
+            sessao: SessaoNavegador com o Saiku já preparado, reaproveitada entre execuções
+                (padrão: abre e encerra um navegador a cada chamada de df_vidas_operadora)
+            diario: DiarioExecucao; com ele blocos já extraídos no mesmo dia não são refeitos após uma falha
+        """
         self.logger = logger
+        self.headless = headless
+        self.sessao = sessao
+        self.diario = diario
 
     def configurar_driver(self):
         options = webdriver.ChromeOptions()
-        #options.add_argument("--headless")  # MODO INVISÍVEL
+        if self.headless:
+            options.add_argument("--headless=new")  # MODO INVISÍVEL
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--window-size=1920,1080")
@@ -23,25 +112,28 @@ class ExtratorPentaho:
 
 
     def selecionar_cubo(self, driver, wait):
-        cubo_dropdown = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "select")))
+        esperas = Esperas(driver)
+        cubo_dropdown = esperas.clicavel(By.CSS_SELECTOR, "select", etapa="cubo")
         select = Select(cubo_dropdown)
         for option in select.options:
             if option.text.strip() and option.text.strip().lower() != "select a cube":
                 select.select_by_visible_text(option.text)
                 break
-        time.sleep(3)
+        # Metadados do cubo carregados: medidas listadas e nenhuma requisição pendente
+        esperas.presentes(By.CSS_SELECTOR, "a.measure", etapa="cubo", timeout=30)
+        esperas.rede_ociosa(etapa="cubo", timeout=30)
         return option.text
 
 
     def adicionar_medidas(self, driver, wait):
-
-        medidas_links = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.measure")))
+        esperas = Esperas(driver)
+        medidas_links = esperas.presentes(By.CSS_SELECTOR, "a.measure", etapa="medidas")
 
         #medidas_links = driver.find_elements(By.CSS_SELECTOR, "a.measure")
         for medida_link in medidas_links:
             try:
                 medida_link.click()
-                time.sleep(0.5)
+                esperas.rede_ociosa(etapa="medidas", quieto=0.1)
             except:
                 continue
 
@@ -56,6 +148,7 @@ class ExtratorPentaho:
 
 
     def drag_multiple_safe(self, titles, driver):
+        esperas = Esperas(driver)
         for title in titles:
             try:
                 # Encontrar source com múltiplos xpaths
@@ -78,16 +171,15 @@ class ExtratorPentaho:
                     self.logger.error(f"❌ Elemento '{title}' não encontrado")
                     continue
 
-                # Garantir visibilidade
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", source)
-                time.sleep(0.3)
+                # Garantir visibilidade (rolagem instantânea, sem animação)
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'instant'});", source)
 
                 # Target
-                target = driver.find_element(By.CSS_SELECTOR, ".fields_list_body.rows.axis_fields")
+                target = esperas.clicavel(By.CSS_SELECTOR, ".fields_list_body.rows.axis_fields", etapa="dimensoes")
 
-                # Drag and drop
+                # Drag and drop: aguarda o Saiku atualizar a consulta e o DOM do eixo de linhas
                 ActionChains(driver).drag_and_drop(source, target).perform()
-                time.sleep(0.5)
+                esperas.pagina_pronta(etapa="dimensoes", quieto=0.1)
 
             except Exception as e:
                 print(f"❌ Erro com '{title}': {e}")
@@ -95,130 +187,275 @@ class ExtratorPentaho:
 
 
     def clicar_operadora(self, driver, wait, codigo_operadora):
+        try:
+            return bool(self.clicar_operadoras(driver, wait, [codigo_operadora]))
+        except OperadorasNaoEncontradas:
+            return False
 
-        # Filtrar operadoras
-        time.sleep(0.5)
-        operadoras_section = driver.find_element(By.XPATH, "//*[contains(text(), 'Registro')]")
-        operadoras_section.click()
+    def clicar_operadoras(self, driver, wait, codigos_operadoras: list[str]) -> list[str]:
+        """
+        Substitui os membros do filtro de Registro pelas operadoras informadas
+
+        Returns:
+            Códigos efetivamente marcados (os não encontrados são registrados no log)
 
-        time.sleep(0.5)
+        Raises:
+            OperadorasNaoEncontradas: Se nenhuma das operadoras existir no filtro
+        """
 
-        use_result_label = wait.until(EC.element_to_be_clickable((By.XPATH, "//label[contains(text(), 'Use Result')]")))
-        use_result_label.click()
+        # Filtrar operadoras
+        esperas = Esperas(driver)
+        operadoras_section = esperas.clicavel(By.XPATH, "//*[contains(text(), 'Registro')]", etapa="filtro_abrir")
+        operadoras_section.click()
 
-        use_result_label = wait.until(EC.element_to_be_clickable((By.XPATH, "//label[contains(text(), 'Use Result')]")))
-        use_result_label.click()
+        use_result = "//label[contains(text(), 'Use Result')]"
+        esperas.clicavel(By.XPATH, use_result, etapa="filtro_abrir").click()
+        esperas.rede_ociosa(etapa="filtro_membros", quieto=0.1)
+        esperas.clicavel(By.XPATH, use_result, etapa="filtro_abrir").click()
 
-        botao_remove = wait.until(EC.element_to_be_clickable((By.ID, "remove_all_members")))
+        botao_remove = esperas.clicavel(By.ID, "remove_all_members", etapa="filtro_membros")
         botao_remove.click()
 
-        try:
-            time.sleep(1)
-
-            xpath = f"//input[@label='{codigo_operadora}']"
-            checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
-            checkbox.click()
+        # Lista de membros recarregada após remover todos
+        esperas.pagina_pronta(etapa="filtro_membros", quieto=0.1)
 
-            botao_add = wait.until(EC.element_to_be_clickable((By.ID, "add_members")))
-            botao_add.click()
+        marcadas = []
+        for codigo_operadora in codigos_operadoras:
+            try:
+                xpath = f"//input[@label='{codigo_operadora}']"
+                checkbox = esperas.clicavel(By.XPATH, xpath, etapa="filtro_marcar", timeout=5)
+                checkbox.click()
+                marcadas.append(codigo_operadora)
+            except:
+                self.logger.error(f"❌ Operadora {codigo_operadora} não encontrada")
 
-            # CLICAR NO OK
-            botao_ok = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[@href='#save']")))
-            botao_ok.click()
-            return True
-        except:
-            self.logger.error(f"❌ Operadora {codigo_operadora} não encontrada")
+        if not marcadas:
             # CLICAR NOK
-            botao_nok = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[@href='#close']")))
+            botao_nok = esperas.clicavel(By.XPATH, "//a[@href='#close']", etapa="filtro_fechar")
             botao_nok.click()
+            raise OperadorasNaoEncontradas(", ".join(codigos_operadoras))
+
+        botao_add = esperas.clicavel(By.ID, "add_members", etapa="filtro_fechar")
+        botao_add.click()
 
-        return False
+        # CLICAR NO OK
+        botao_ok = esperas.clicavel(By.XPATH, "//a[@href='#save']", etapa="filtro_fechar")
+        botao_ok.click()
+        esperas.invisivel(By.XPATH, "//a[@href='#save']", etapa="filtro_fechar")
+        return marcadas
 
 
     def executar_consulta_e_obter_dados(self, driver, tempo):
-        run_button = driver.find_element(By.ID, "run_icon")
+        esperas = Esperas(driver)
+        inicio = time.perf_counter()
+        run_button = esperas.clicavel(By.ID, "run_icon", etapa="consulta")
+        anteriores = esperas.iniciadas()
         run_button.click()
 
-        max_wait = tempo  # 10 minutos
-        waited = 0
-        while waited < max_wait:
-            try:
-                popup = driver.find_elements(By.XPATH, "//*[contains(text(), 'Running query')]")
-                if not popup or not any(p.is_displayed() for p in popup):
-                    self.logger.info("✓ Processamento concluído!")
-                    break
-            except:
-                pass
-            time.sleep(2)
-            waited += 2
-
-        # Aguardar mais um tempo extra para tabela aparecer
-        time.sleep(1)
+        # A requisição da consulta precisa ter saído: antes disso a rede já está ociosa e a tabela
+        # visível ainda é a da consulta anterior (bloco anterior ou sessão de navegador reaproveitada)
+        try:
+            esperas.requisicao_iniciada(anteriores, etapa="consulta", timeout=30)
+        except TimeoutException:
+            self.logger.error("❌ Consulta não iniciada após o clique em executar")
+            METRICAS.incrementar("hermes_pentaho_erros_total", 1, "Falhas por etapa", etapa="consulta")
+            raise
 
-        # Procurar tabela
-        table_found = False
-        for attempt in range(10):  # 10 tentativas
-            try:
-                table_element = driver.find_element(By.XPATH, '//*[@id="table_14"]')
-                if table_element.is_displayed():
-                    rows = table_element.find_elements(By.XPATH, ".//tr")
-                    if len(rows) > 1:
-                        table_found = True
-                        break
-            except:
-                pass
-            time.sleep(2)
+        # Requisição da consulta concluída e aviso "Running query" oculto (até `tempo` segundos, 10 minutos por padrão)
+        try:
+            esperas.rede_ociosa(etapa="consulta", quieto=0.1, timeout=tempo)
+            esperas.invisivel(By.XPATH, "//*[contains(text(), 'Running query')]", etapa="consulta", timeout=tempo)
+            self.logger.info("✓ Processamento concluído!")
+        except TimeoutException:
+            self.logger.warning("⚠️ Consulta ainda em execução após %ss", tempo)
+        METRICAS.observar(ETAPA, time.perf_counter() - inicio, AJUDA_ETAPA, etapa="consulta")
+        inicio = time.perf_counter()
+
+        # Procurar tabela: visível, com ao menos uma linha de dados e DOM estável (renderização concluída)
+        def tabela_renderizada(driver):
+            return driver.execute_script(SCRIPT_TABELA_PRONTA, "table_14")
 
-        if table_found:
-            # Capturar dados
-            table_html = table_element.get_attribute("outerHTML")
-            df = pd.read_html(table_html, decimal=",", thousands=".")[0]
-        else:
+        try:
+            esperas.ate(tabela_renderizada, etapa="tabela", timeout=20)
+            esperas.dom_estavel(etapa="tabela", quieto=0.2, timeout=20)
+            esperas.ate(tabela_renderizada, etapa="tabela", timeout=5)
+        except TimeoutException:
             self.logger.error("❌ Tabela não encontrada após todas as tentativas")
+            METRICAS.incrementar("hermes_pentaho_erros_total", 1, "Falhas por etapa", etapa="tabela")
+            raise
 
-        df_preenchido = df.ffill()
-        # Remover .0 e transformar em object
-        df_preenchido["Registro"] = df_preenchido["Registro"].astype(str).str.replace(".0", "", regex=False)
+        # Capturar dados: uma chamada ao navegador com os valores já organizados por coluna
+        df_preenchido = tabela_para_dataframe(driver.execute_script(SCRIPT_TABELA, "table_14"))
 
+        METRICAS.observar(ETAPA, time.perf_counter() - inicio, AJUDA_ETAPA, etapa="tabela")
+        METRICAS.incrementar("hermes_pentaho_linhas_total", len(df_preenchido), "Linhas capturadas do Saiku")
         return df_preenchido
 
 
-    def df_vidas_operadora(self, operadoras: list[str]) -> pd.DataFrame:
-        driver = self.configurar_driver()
-        wait = WebDriverWait(driver, 10)
+    def preparar_consulta(self, driver, wait) -> str:
+        """
+        Abre o Saiku e monta a consulta base: cubo, todas as medidas e dimensões nas linhas
 
-        try:
-            url = "https://www.ans.gov.br/pentaho/content/saiku-ui/index.html?biplugin5=true&userid=penanoprod&password=PRDAUpent001"
-            driver.get(url)
+        Returns:
+            Nome do cubo selecionado
+        """
+        with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="pagina"):
+            driver.get(URL_SAIKU_UI)
+            esperas = Esperas(driver, timeout=30)
+            esperas.instalar_monitor()
+            esperas.pagina_pronta(etapa="pagina")
 
+        with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="cubo"):
             cubo = self.selecionar_cubo(driver, wait)
+        with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="medidas"):
             self.adicionar_medidas(driver, wait)
 
+        with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="dimensoes"):
             self.clicar_categorias(driver)
-            elementos = ["Registro", "Razao Social", "Cobertura Assistencial", "UF", "Nome  do municipio"]
-            self.drag_multiple_safe(elementos, driver)
+            self.drag_multiple_safe(DIMENSOES_PENTAHO, driver)
+        return cubo
+
+
+    def df_vidas_operadora(
+        self,
+        operadoras: list[str],
+        consulta_unica: bool = False,
+        max_membros: int = MAX_MEMBROS_FILTRO,
+        progresso: Callable[[int, int, int], None] | None = None,
+        cancelar: threading.Event | None = None,
+    ) -> pd.DataFrame:
+        """
+        Extrai a tabela de vidas das operadoras pela interface do Saiku
+
+        Args:
+            operadoras: Códigos de Registro ANS
+            consulta_unica: True marca várias operadoras no filtro de Registro e executa uma consulta
+                por bloco de até `max_membros` (False: uma consulta por operadora)
+            max_membros: Tamanho máximo do bloco no modo de consulta única
+            progresso: Chamada a cada bloco com (blocos concluídos, total, linhas até agora)
+            cancelar: Evento que interrompe a extração antes do próximo bloco (com diário, retomável)
+
+        Returns:
+            DataFrame combinado (use `separar_por_operadora` para um DataFrame por Registro)
+
+        Raises:
+            ExtracaoIncompleta: Se algum bloco falhar (com diário: se algum bloco ficar pendente;
+                a próxima chamada no mesmo dia refaz apenas esses blocos)
+        """
+        blocos = dividir_em_blocos(operadoras, max_membros if consulta_unica else 1)
+
+        execucao = None
+        if self.diario is not None:
+            chaves = {"|".join(bloco): bloco for bloco in blocos}
+            execucao = self.diario.iniciar("Pentaho", date.today().isoformat(), list(chaves))
+            pendentes = [chaves[chave] for chave in self.diario.pendentes(execucao)]
+            if len(pendentes) < len(blocos):
+                self.logger.info(f"⏯️ Retomando execução {execucao}: {len(pendentes)} de {len(blocos)} blocos pendentes")
+            if not pendentes:
+                return self._finalizar_execucao(execucao)
+            blocos = pendentes
+
+        if self.sessao is not None:
+            try:
+                with self.sessao.usar() as (driver, wait, cubo):
+                    return self._extrair_blocos(driver, wait, cubo, blocos, execucao, progresso, cancelar)
+            finally:
+                METRICAS.gravar_arquivo()
 
-            df_final = pd.DataFrame()
+        with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="driver"):
+            driver = self.configurar_driver()
+        wait = WebDriverWait(driver, 10)
+
+        try:
+            cubo = self.preparar_consulta(driver, wait)
+            return self._extrair_blocos(driver, wait, cubo, blocos, execucao, progresso, cancelar)
 
-            for operadora in operadoras:
+        finally:
+            driver.quit()
+            METRICAS.gravar_arquivo()
+
+    def _extrair_blocos(
+        self,
+        driver,
+        wait,
+        cubo: str,
+        blocos: list[list[str]],
+        execucao: str | None = None,
+        progresso: Callable[[int, int, int], None] | None = None,
+        cancelar: threading.Event | None = None,
+    ) -> pd.DataFrame:
+        """
+        Filtra e consulta cada bloco de operadoras em um navegador já preparado
+
+        Os resultados são acumulados em lista e concatenados uma única vez; com diário, cada
+        bloco é gravado assim que termina e o resultado final é lido do diário.
+        """
+        dfs = []
+        falhas = []
+        linhas = 0
+
+        for concluidos, bloco in enumerate(blocos):
+            if cancelar is not None and cancelar.is_set():
+                self.logger.info(f"⏹️ Extração cancelada após {concluidos} de {len(blocos)} blocos")
+                break
+            if progresso is not None and concluidos:
+                progresso(concluidos, len(blocos), linhas)
+            operadora = bloco[0] if len(bloco) == 1 else f"{bloco[0]} ... {bloco[-1]} ({len(bloco)})"
+            for tentativa in (1, 2):
                 try:
-                    self.clicar_operadora(driver, wait, operadora)
+                    with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="filtro_operadora"):
+                        self.clicar_operadoras(driver, wait, bloco)
                     df1 = self.executar_consulta_e_obter_dados(driver, 600)
+                    df1["Cubo"] = coluna_constante(cubo, len(df1))
                     self.logger.info(f"✅ Operadora {operadora} processada com sucesso!")
 
-                    if df_final.empty:  # Se usando DataFrame vazio
-                        df_final = df1.copy()
-                    else:
-                        df_final = pd.concat([df1, df_final], ignore_index=True)
-                except:
+                    dfs.append(df1)
+                    linhas += len(df1)
+                    if execucao is not None:
+                        self.diario.concluir(execucao, "|".join(bloco), df1)
+                    break
+                except Exception as erro:  # KeyboardInterrupt interrompe a execução (retomável pelo diário)
+                    # Sessão persistente caiu no meio da execução: recria o navegador e repete o bloco
+                    if tentativa == 1 and self.sessao is not None and not self.sessao.saudavel():
+                        self.logger.warning("🔁 Sessão do navegador perdida, recuperando...")
+                        driver, wait, cubo = self.sessao.recuperar()
+                        continue
                     self.logger.warning(f"⚠️ Nenhum dado retornado para operadora {operadora}")
-                    continue
-
-            # Remover duplicados no final
-            df_final = df_final.drop_duplicates(ignore_index=True)
-
-            df_final["Cubo"] = cubo
-            return df_final
-
-        finally:
-            driver.quit()
+                    METRICAS.incrementar("hermes_pentaho_erros_total", 1, "Falhas por etapa", etapa="operadora")
+                    if isinstance(erro, OperadorasNaoEncontradas):
+                        if execucao is not None:
+                            self.diario.concluir(execucao, "|".join(bloco), None)  # Operadoras inexistentes
+                        break
+                    falhas.append(operadora)
+                    if execucao is not None:
+                        self.diario.falhar(execucao, "|".join(bloco), f"{type(erro).__name__}: {erro}")
+                    break
+        else:
+            if progresso is not None:
+                progresso(len(blocos), len(blocos), linhas)
+
+        if execucao is not None:
+            return self._finalizar_execucao(execucao)
+        if falhas:
+            raise ExtracaoIncompleta(f"{len(falhas)} de {len(blocos)} blocos com falha: {falhas}")
+
+        # Remover duplicados no final
+        return concatenar(dfs).drop_duplicates(ignore_index=True) if dfs else pd.DataFrame()
+
+    def _finalizar_execucao(self, execucao: str) -> pd.DataFrame:
+        """
+        Monta o resultado a partir do diário e encerra a execução
+
+        Raises:
+            ExtracaoIncompleta: Se algum bloco ficou pendente ou com erro (a execução continua aberta)
+        """
+        pendentes = self.diario.pendentes(execucao)
+        if pendentes:
+            raise ExtracaoIncompleta(
+                f"{len(pendentes)} blocos pendentes ou com falha na execução {execucao}; execute novamente para retomar"
+            )
+        df_final = self.diario.resultados(execucao)
+        self.diario.finalizar(execucao)
+        if df_final is None:
+            return pd.DataFrame()
+        return df_final.drop_duplicates(ignore_index=True)
@@ -0,0 +1,284 @@
+"""
+Extração do Pentaho pela API REST do Saiku (sem navegador)
+
+O Saiku UI usado por `ExtratorPentaho` é apenas um cliente da API REST do plugin Saiku:
+aqui a mesma consulta (primeiro cubo, todas as medidas, níveis de DIMENSOES_PENTAHO nas
+linhas e filtro por Registro) é enviada diretamente em MDX e o cellset JSON é convertido
+no mesmo DataFrame da automação Selenium.
+"""
+
+import logging
+import os
+import time
+import uuid
+from urllib.parse import quote
+
+import pandas as pd
+import requests
+
+from .esquemas import DIMENSOES_PENTAHO, coluna_constante, compactar_pentaho, concatenar
+from .metricas import METRICAS
+from .sessao_http import SessaoHTTP
+
+URL_SAIKU = "https://www.ans.gov.br/pentaho/plugin/saiku/api"
+"""Raiz da API REST do plugin Saiku no Pentaho da ANS"""
+
+USUARIO_SAIKU = "penanoprod"
+SENHA_SAIKU = "PRDAUpent001"
+
+ETAPA = "hermes_pentaho_etapa_segundos"
+AJUDA_ETAPA = "Duração de cada etapa da automação do Saiku"
+
+MAX_OPERADORAS_CONSULTA = 500
+"""Máximo de códigos de Registro no filtro de uma consulta MDX (blocos maiores são divididos)"""
+
+VAZIOS = {None, "", "null"}
+"""Valores de célula tratados como ausentes (cabeçalhos repetidos são omitidos no cellset)"""
+
+
+def dividir_em_blocos(itens: list, tamanho: int) -> list[list]:
+    """Divide a lista em blocos consecutivos de até `tamanho` itens"""
+    tamanho = max(1, int(tamanho))
+    return [itens[i : i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+def separar_por_operadora(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Separa o resultado combinado de várias operadoras em um DataFrame por Registro"""
+    return {
+        str(registro): grupo.reset_index(drop=True)
+        for registro, grupo in df.groupby("Registro", observed=True, sort=False)
+    }
+
+
+def escapar_mdx(nome: str) -> str:
+    """Escapa um nome para uso entre colchetes no MDX"""
+    return nome.replace("]", "]]")
+
+
+def lista_mdx(codigos: list[str]) -> str:
+    """Literal de texto MDX com os códigos delimitados por | (ex: "|123|456|")"""
+    return '"|' + "|".join(str(codigo).replace('"', '""') for codigo in codigos) + '|"'
+
+
+class ExtratorPentahoRest:
+    """
+    Cliente HTTP do Saiku com a mesma saída de `ExtratorPentaho.df_vidas_operadora`
+
+    Exemplo:
+        df = ExtratorPentahoRest(logger).df_vidas_operadora(["123456", "654321"])
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        url: str = URL_SAIKU,
+        usuario: str | None = None,
+        senha: str | None = None,
+        timeout_consulta: float = 600,
+    ):
+        """
+        Args:
+            logger: Logger da aplicação
+            url: Raiz da API do Saiku (ex: servidor local de benchmark)
+            usuario: Usuário do Pentaho; padrão HERMES_PENTAHO_USUARIO ou o usuário público da ANS
+            senha: Senha do Pentaho; padrão HERMES_PENTAHO_SENHA ou a senha pública da ANS
+            timeout_consulta: Timeout (s) da execução de cada consulta MDX
+        """
+        self.logger = logger
+        self.url = url.rstrip("/")
+        self.usuario = usuario or os.getenv("HERMES_PENTAHO_USUARIO", USUARIO_SAIKU)
+        self.timeout_consulta = timeout_consulta
+
+        self.sessao = SessaoHTTP(logger, headers={"Accept": "application/json"}, pool_maxsize=2)
+        self.sessao.session.auth = (self.usuario, senha or os.getenv("HERMES_PENTAHO_SENHA", SENHA_SAIKU))
+
+    def _get(self, caminho: str):
+        resposta = self.sessao.get(f"{self.url}/{caminho}")
+        resposta.raise_for_status()
+        return resposta.json()
+
+    def descobrir_cubo(self, nome: str | None = None) -> dict:
+        """
+        Retorna o cubo a consultar (o primeiro visível, como na seleção da interface)
+
+        Args:
+            nome: Nome ou título do cubo; padrão é o primeiro cubo disponível
+
+        Raises:
+            LookupError: Se nenhum cubo for encontrado
+        """
+        for conexao in self._get(f"{quote(self.usuario)}/discover"):
+            for catalogo in conexao.get("catalogs", []):
+                for esquema in catalogo.get("schemas", []):
+                    for cubo in esquema.get("cubes", []):
+                        if not cubo.get("visible", True):
+                            continue
+                        if nome is None or nome in (cubo.get("name"), cubo.get("caption")):
+                            return cubo
+        raise LookupError(f"Cubo não encontrado: {nome or '(primeiro disponível)'}")
+
+    def metadados(self, cubo: dict) -> dict:
+        """Dimensões, hierarquias, níveis e medidas do cubo"""
+        partes = [cubo["connection"], cubo["catalog"], cubo["schema"], cubo["name"]]
+        caminho = "/".join(quote(parte, safe="") for parte in partes)
+        return self._get(f"{quote(self.usuario)}/discover/{caminho}/metadata")
+
+    def montar_mdx(self, cubo: dict, metadados: dict, operadoras: list[str]) -> str:
+        """
+        Monta o MDX equivalente à consulta montada na interface do Saiku
+
+        * Colunas: todas as medidas visíveis
+        * Linhas: produto das hierarquias de DIMENSOES_PENTAHO; em cada hierarquia, o nível mais
+          profundo selecionado (o Saiku achata os níveis ancestrais em colunas próprias)
+        * Filtro: membros cujo ancestral no nível Registro está em `operadoras`
+
+        Raises:
+            LookupError: Se algum nível de DIMENSOES_PENTAHO não existir no cubo
+        """
+        niveis = {}
+        for dimensao in metadados.get("dimensions", []):
+            for hierarquia in dimensao.get("hierarchies", []):
+                for posicao, nivel in enumerate(hierarquia.get("levels", [])):
+                    for titulo in (nivel.get("caption"), nivel.get("name")):
+                        if titulo in DIMENSOES_PENTAHO and titulo not in niveis:
+                            niveis[titulo] = (hierarquia["uniqueName"], posicao, nivel["uniqueName"])
+
+        ausentes = [titulo for titulo in DIMENSOES_PENTAHO if titulo not in niveis]
+        if ausentes:
+            raise LookupError(f"Níveis ausentes no cubo: {ausentes}")
+
+        # Nível mais profundo de cada hierarquia, na ordem de DIMENSOES_PENTAHO
+        profundos: dict[str, tuple[int, str]] = {}
+        for titulo in DIMENSOES_PENTAHO:
+            hierarquia, posicao, nivel = niveis[titulo]
+            if hierarquia not in profundos or posicao > profundos[hierarquia][0]:
+                profundos[hierarquia] = (posicao, nivel)
+
+        hierarquia_registro, _, nivel_registro = niveis["Registro"]
+        conjuntos = []
+        for hierarquia, (_, nivel) in profundos.items():
+            conjunto = f"{nivel}.Members"
+            if hierarquia == hierarquia_registro:
+                registro = f"Ancestor({hierarquia}.CurrentMember, {nivel_registro}).Name"
+                conjunto = f'Filter({conjunto}, InStr({lista_mdx(operadoras)}, "|" || {registro} || "|") > 0)'
+            conjuntos.append(conjunto)
+
+        medidas = [medida["uniqueName"] for medida in metadados.get("measures", []) if medida.get("visible", True)]
+        return (
+            f"SELECT NON EMPTY {{{', '.join(medidas)}}} ON COLUMNS,\n"
+            f"NON EMPTY {{{' * '.join(conjuntos)}}} ON ROWS\n"
+            f"FROM [{escapar_mdx(cubo['name'])}]"
+        )
+
+    def executar_mdx(self, cubo: dict, mdx: str) -> dict:
+        """
+        Executa uma consulta MDX e retorna o resultado do Saiku (cellset achatado)
+
+        Raises:
+            RuntimeError: Se o Saiku retornar erro na consulta
+        """
+        consulta = {
+            "name": str(uuid.uuid4()).upper(),
+            "queryModel": {},
+            "cube": cubo,
+            "mdx": mdx,
+            "queryType": "OLAP",
+            "type": "MDX",
+            "parameters": {},
+            "plugins": {},
+            "properties": {},
+            "metadata": {},
+        }
+        resposta = self.sessao.post(f"{self.url}/api/query/execute", json=consulta, timeout=self.timeout_consulta)
+        resposta.raise_for_status()
+        resultado = resposta.json()
+        if resultado.get("error"):
+            raise RuntimeError(f"Erro do Saiku: {resultado['error']}")
+        return resultado
+
+    def cellset_para_dataframe(self, resultado: dict) -> pd.DataFrame:
+        """
+        Converte o cellset do Saiku no DataFrame da tabela da interface
+
+        A última linha de cabeçalho traz os títulos dos níveis (ROW_HEADER_HEADER) e das medidas
+        (COLUMN_HEADER); cabeçalhos de linha repetidos vêm vazios e são preenchidos com ffill
+        (só nas colunas de DIMENSOES_PENTAHO: medida vazia continua nula).
+        """
+        cellset = resultado.get("cellset") or []
+        topo = int(resultado.get("topOffset", 1))
+        if len(cellset) <= topo:
+            return pd.DataFrame()
+
+        titulos = [celula.get("value") for celula in cellset[topo - 1]]
+        linhas = cellset[topo:]
+        colunas = {}
+        for j, titulo in enumerate(titulos):
+            celulas = [linha[j] if j < len(linha) else {} for linha in linhas]
+            if celulas and celulas[0].get("type") == "DATA_CELL":
+                valores = [(celula.get("properties") or {}).get("raw", celula.get("value")) for celula in celulas]
+                colunas[titulo] = pd.to_numeric(
+                    pd.Series([None if valor in VAZIOS else valor for valor in valores], dtype=object),
+                    errors="coerce",
+                )
+            else:
+                serie = pd.Series(
+                    [None if celula.get("value") in VAZIOS else celula.get("value") for celula in celulas], dtype=object
+                )
+                colunas[titulo] = serie.ffill() if titulo in DIMENSOES_PENTAHO else serie
+
+        df = pd.DataFrame(colunas)
+        if "Registro" in df.columns:
+            # Converte apenas os códigos presentes: nulo continua nulo (astype(str) o transformaria em "nan")
+            registros = df["Registro"]
+            df["Registro"] = registros.where(
+                registros.isna(), registros.astype(str).str.replace(r"\.0$", "", regex=True)
+            )
+        return compactar_pentaho(df)
+
+    def df_vidas_operadora(
+        self, operadoras: list[str], cubo: str | None = None, max_operadoras: int = MAX_OPERADORAS_CONSULTA
+    ) -> pd.DataFrame:
+        """
+        Extrai a tabela de vidas das operadoras com uma consulta MDX por bloco de operadoras
+
+        Args:
+            operadoras: Códigos de Registro ANS
+            cubo: Nome do cubo; padrão é o primeiro disponível
+            max_operadoras: Códigos por consulta; listas maiores são divididas automaticamente
+
+        Returns:
+            DataFrame combinado com as colunas de DIMENSOES_PENTAHO, as medidas e o Cubo
+            (use `separar_por_operadora` para um DataFrame por Registro)
+        """
+        try:
+            with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="cubo"):
+                cubo_selecionado = self.descobrir_cubo(cubo)
+                metadados = self.metadados(cubo_selecionado)
+
+            dfs = []
+            for bloco in dividir_em_blocos(operadoras, max_operadoras):
+                mdx = self.montar_mdx(cubo_selecionado, metadados, bloco)
+
+                inicio = time.perf_counter()
+                resultado = self.executar_mdx(cubo_selecionado, mdx)
+                METRICAS.observar(ETAPA, time.perf_counter() - inicio, AJUDA_ETAPA, etapa="consulta")
+
+                with METRICAS.medir(ETAPA, AJUDA_ETAPA, etapa="tabela"):
+                    df_bloco = self.cellset_para_dataframe(resultado)
+                if not df_bloco.empty:
+                    dfs.append(df_bloco)
+
+            df = concatenar(dfs).drop_duplicates(ignore_index=True) if dfs else pd.DataFrame()
+            self.logger.info("✅ %s operadoras consultadas: %s linhas", len(operadoras), len(df))
+            METRICAS.incrementar("hermes_pentaho_linhas_total", len(df), "Linhas capturadas do Saiku")
+
+            df["Cubo"] = coluna_constante(cubo_selecionado.get("caption") or cubo_selecionado["name"], len(df))
+            return df
+
+        except (requests.RequestException, ValueError, LookupError, RuntimeError) as e:
+            self.logger.error("❌ Falha na consulta ao Saiku: %s", str(e))
+            METRICAS.incrementar("hermes_pentaho_erros_total", 1, "Falhas por etapa", etapa="rest")
+            raise
+
+        finally:
+            METRICAS.gravar_arquivo()
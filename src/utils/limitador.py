@@ -0,0 +1,216 @@
+"""
+Limitador adaptativo de requisições (token bucket + AIMD) compartilhado pelo processo
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from .metricas import METRICAS
+
+STATUS_SOBRECARGA = frozenset({429, 503})
+"""Códigos HTTP que indicam que o servidor está limitando ou sobrecarregado"""
+
+
+def segundos_retry_after(valor: str | None) -> float | None:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos de espera"""
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+class LimitadorAdaptativo:
+    """
+    Controla concorrência e taxa de requisições a um endpoint com AIMD (aumento aditivo, redução multiplicativa)
+
+    * `limite` é a quantidade de requisições simultâneas permitida; cresce `incremento` a cada
+      janela de respostas saudáveis (+incremento/limite por resposta, como no controle de congestionamento do TCP),
+      dez vezes mais devagar perto do limite em que houve a última sobrecarga
+    * HTTP 429/503, timeouts/quedas de conexão ou latência acima de `tolerancia_latencia` vezes a
+      latência de referência multiplicam o limite por `fator_reducao` (no máximo uma redução por `intervalo_reducao`)
+    * A taxa do token bucket acompanha o limite (limite / latência de referência), o que evita rajadas
+    * Retry-After pausa todas as requisições do processo até o horário indicado
+
+    Exemplo:
+        inicio = limitador.adquirir()
+        resposta = session.post(...)
+        limitador.liberar(inicio, resposta.status_code, resposta.headers.get("Retry-After"))
+    """
+
+    def __init__(
+        self,
+        limite_inicial: float = 4,
+        limite_minimo: float = 1,
+        limite_maximo: float = 32,
+        incremento: float = 1,
+        fator_reducao: float = 0.5,
+        taxa_inicial: float = 10,
+        taxa_maxima: float = 200,
+        tolerancia_latencia: float = 2.0,
+        intervalo_reducao: float = 1.0,
+        retry_after_maximo: float = 120,
+    ):
+        """
+        Args:
+            limite_inicial: Requisições simultâneas permitidas no início
+            limite_minimo: Piso do limite após reduções
+            limite_maximo: Teto do limite
+            incremento: Aumento do limite a cada janela de respostas saudáveis
+            fator_reducao: Fator aplicado ao limite em cada redução
+            taxa_inicial: Requisições/s antes da primeira medição de latência
+            taxa_maxima: Teto de requisições/s
+            tolerancia_latencia: Latência (média móvel) acima de N vezes a referência conta como sobrecarga
+            intervalo_reducao: Tempo mínimo (s) entre reduções (respostas da mesma rajada reduzem uma vez)
+            retry_after_maximo: Pausa máxima (s) aceita de um Retry-After
+        """
+        self.limite_minimo = max(1.0, float(limite_minimo))
+        self.limite_maximo = max(self.limite_minimo, float(limite_maximo))
+        self.limite = min(max(float(limite_inicial), self.limite_minimo), self.limite_maximo)
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.taxa_maxima = taxa_maxima
+        self.taxa = min(float(taxa_inicial), taxa_maxima)
+        self.tolerancia_latencia = tolerancia_latencia
+        self.intervalo_reducao = intervalo_reducao
+        self.retry_after_maximo = retry_after_maximo
+
+        self._condicao = threading.Condition()
+        self._em_andamento = 0
+        self._tokens = 1.0
+        self._reposto_em = time.monotonic()
+        self._pausado_ate = 0.0
+        self._reduzido_em = 0.0
+        self._limite_sobrecarga: float | None = None
+        self._latencia_media: float | None = None
+        self._latencia_referencia: float | None = None
+        self._aumentos = 0
+        self._reducoes: dict[str, int] = {}
+
+    def _repor(self, agora: float):
+        capacidade = max(1.0, self.limite)
+        self._tokens = min(capacidade, self._tokens + (agora - self._reposto_em) * self.taxa)
+        self._reposto_em = agora
+
+    def adquirir(self) -> float:
+        """
+        Aguarda uma vaga (limite de concorrência, token disponível e sem pausa de Retry-After)
+
+        Returns:
+            Instante (time.monotonic) de início da requisição, a ser informado em `liberar`
+        """
+        inicio = time.monotonic()
+        with self._condicao:
+            while True:
+                agora = time.monotonic()
+                self._repor(agora)
+                if self._pausado_ate > agora:
+                    espera = self._pausado_ate - agora
+                elif self._em_andamento >= int(self.limite):
+                    espera = None  # aguarda uma requisição terminar
+                elif self._tokens < 1:
+                    espera = (1 - self._tokens) / self.taxa
+                else:
+                    self._tokens -= 1
+                    self._em_andamento += 1
+                    break
+                self._condicao.wait(espera)
+
+        agora = time.monotonic()
+        METRICAS.observar("hermes_limitador_espera_segundos", agora - inicio, "Espera por vaga no limitador")
+        return agora
+
+    def liberar(self, inicio: float, status: int | None = None, retry_after: str | None = None, falha: bool = False):
+        """
+        Devolve a vaga e ajusta o limite conforme o resultado da requisição
+
+        Args:
+            inicio: Valor retornado por `adquirir`
+            status: Código HTTP da resposta (None se não houve resposta)
+            retry_after: Header Retry-After da resposta
+            falha: True para timeout/queda de conexão (conta como sobrecarga)
+        """
+        agora = time.monotonic()
+        latencia = agora - inicio
+        with self._condicao:
+            self._em_andamento = max(0, self._em_andamento - 1)
+
+            pausa = segundos_retry_after(retry_after)
+            if pausa:
+                self._pausado_ate = max(self._pausado_ate, agora + min(pausa, self.retry_after_maximo))
+
+            if falha:
+                self._reduzir(agora, "falha")
+            elif status in STATUS_SOBRECARGA:
+                self._reduzir(agora, f"http_{status}")
+            elif status is not None and status < 500:
+                self._registrar_latencia(latencia)
+                if self._latencia_media > self._latencia_referencia * self.tolerancia_latencia:
+                    if self._reduzir(agora, "latencia"):
+                        # Nova referência: só um novo aumento relevante da latência volta a reduzir
+                        self._latencia_referencia = self._latencia_media
+                else:
+                    self._aumentar()
+
+            self._condicao.notify_all()
+
+    def _registrar_latencia(self, latencia: float):
+        if self._latencia_media is None:
+            self._latencia_media = self._latencia_referencia = latencia
+            return
+        self._latencia_media += 0.2 * (latencia - self._latencia_media)
+        if self._latencia_media < self._latencia_referencia:
+            self._latencia_referencia = self._latencia_media
+        else:
+            # Referência acompanha lentamente mudanças permanentes do servidor (ex: consultas maiores)
+            self._latencia_referencia += 0.01 * (self._latencia_media - self._latencia_referencia)
+
+    def _atualizar_taxa(self):
+        if self._latencia_referencia:
+            self.taxa = min(self.taxa_maxima, self.limite / max(self._latencia_referencia, 0.001))
+
+    def _aumentar(self):
+        passo = self.incremento / self.limite
+        if self._limite_sobrecarga is not None and self.limite + 1 >= self._limite_sobrecarga:
+            # Perto do limite em que o servidor recusou da última vez: sonda devagar
+            passo /= 10
+        self.limite = min(self.limite_maximo, self.limite + passo)
+        self._aumentos += 1
+        self._atualizar_taxa()
+
+    def _reduzir(self, agora: float, motivo: str) -> bool:
+        if agora - self._reduzido_em < self.intervalo_reducao:
+            return False
+        self._reduzido_em = agora
+        self._limite_sobrecarga = self.limite
+        self.limite = max(self.limite_minimo, self.limite * self.fator_reducao)
+        self._reducoes[motivo] = self._reducoes.get(motivo, 0) + 1
+        self._atualizar_taxa()
+        if self._latencia_referencia is None:
+            self.taxa = max(1.0, self.taxa * self.fator_reducao)
+        METRICAS.incrementar("hermes_limitador_reducoes_total", 1, "Reduções do limite adaptativo", motivo=motivo)
+        return True
+
+    def estatisticas(self) -> dict:
+        """Estado atual do limitador (limite, taxa, latências e reduções por motivo)"""
+        with self._condicao:
+            return {
+                "limite": round(self.limite, 2),
+                "taxa": round(self.taxa, 2),
+                "em_andamento": self._em_andamento,
+                "latencia_media": None if self._latencia_media is None else round(self._latencia_media, 4),
+                "latencia_referencia": (
+                    None if self._latencia_referencia is None else round(self._latencia_referencia, 4)
+                ),
+                "aumentos": self._aumentos,
+                "reducoes": dict(self._reducoes),
+            }
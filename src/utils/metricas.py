@@ -0,0 +1,147 @@
+"""
+Métricas de execução (contadores e histogramas) com exportação no formato texto do Prometheus
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BUCKETS_SEGUNDOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+"""Limites padrão dos histogramas de latência (s)"""
+
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+"""Limites dos histogramas de tamanho (bytes)"""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(rotulos: tuple, **extra) -> str:
+    partes = [f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos + tuple(extra.items())]
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Metricas:
+    """
+    Registro de métricas do processo (thread-safe)
+
+    Exemplo:
+        METRICAS.incrementar("hermes_pbi_requisicoes_total", resultado="ok")
+        with METRICAS.medir("hermes_pbi_requisicao_segundos"):
+            ...
+        METRICAS.gravar_arquivo("logs/hermes_metricas.prom")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # nome -> {"tipo", "ajuda", "buckets", "valores": {rotulos: valor | [contagens, soma, total]}}
+        self._metricas: dict[str, dict] = {}
+
+    def _metrica(self, nome: str, tipo: str, ajuda: str, buckets: tuple | None = None) -> dict:
+        metrica = self._metricas.get(nome)
+        if metrica is None:
+            metrica = {"tipo": tipo, "ajuda": ajuda, "buckets": buckets, "valores": {}}
+            self._metricas[nome] = metrica
+        return metrica
+
+    def incrementar(self, nome: str, valor: float = 1, ajuda: str = "", **rotulos):
+        """Soma `valor` a um contador"""
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            valores = self._metrica(nome, "counter", ajuda)["valores"]
+            valores[chave] = valores.get(chave, 0) + valor
+
+    def observar(self, nome: str, valor: float, ajuda: str = "", buckets: tuple = BUCKETS_SEGUNDOS, **rotulos):
+        """Registra uma observação em um histograma"""
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            metrica = self._metrica(nome, "histogram", ajuda, buckets)
+            registro = metrica["valores"].get(chave)
+            if registro is None:
+                registro = [[0] * len(metrica["buckets"]), 0.0, 0]
+                metrica["valores"][chave] = registro
+            for i, limite in enumerate(metrica["buckets"]):
+                if valor <= limite:
+                    registro[0][i] += 1
+            registro[1] += valor
+            registro[2] += 1
+
+    @contextmanager
+    def medir(self, nome: str, ajuda: str = "", **rotulos):
+        """Mede a duração do bloco em um histograma de segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, ajuda, **rotulos)
+
+    def exportar_texto(self) -> str:
+        """Métricas no formato de exposição texto do Prometheus"""
+        linhas = []
+        with self._lock:
+            for nome, metrica in sorted(self._metricas.items()):
+                if metrica["ajuda"]:
+                    linhas.append(f"# HELP {nome} {metrica['ajuda']}")
+                linhas.append(f"# TYPE {nome} {metrica['tipo']}")
+                for rotulos, valor in sorted(metrica["valores"].items()):
+                    if metrica["tipo"] == "counter":
+                        linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+                        continue
+                    contagens, soma, total = valor
+                    for limite, contagem in zip(metrica["buckets"], contagens):
+                        linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, le=limite)} {contagem}")
+                    linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, le='+Inf')} {total}")
+                    linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {soma}")
+                    linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {total}")
+        return "\n".join(linhas) + "\n"
+
+    def gravar_arquivo(self, caminho: str | Path | None = None) -> Path:
+        """
+        Grava as métricas em um arquivo texto (ex: para o textfile collector do node_exporter)
+
+        Args:
+            caminho: Arquivo de destino; padrão HERMES_METRICAS_ARQUIVO ou logs/hermes_metricas.prom
+        """
+        caminho = Path(caminho or os.getenv("HERMES_METRICAS_ARQUIVO", str(Path("logs") / "hermes_metricas.prom")))
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Temporário por thread: tarefas concorrentes (ex: agendador) podem gravar ao mesmo tempo
+        temporario = caminho.with_suffix(f".{threading.get_ident()}.tmp")
+        temporario.write_text(self.exportar_texto(), encoding="utf-8")
+        os.replace(temporario, caminho)
+        return caminho
+
+    def servir(self, porta: int = 9108) -> ThreadingHTTPServer:
+        """
+        Expõe as métricas em http://0.0.0.0:<porta>/metrics em uma thread de fundo
+
+        Returns:
+            Servidor iniciado (use .shutdown() para encerrar)
+        """
+        registro = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                corpo = registro.exportar_texto().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer(("0.0.0.0", porta), Handler)
+        threading.Thread(target=servidor.serve_forever, daemon=True, name="metricas").start()
+        return servidor
+
+
+METRICAS = Metricas()
+"""Registro de métricas compartilhado pelo processo"""
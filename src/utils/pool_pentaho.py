@@ -0,0 +1,218 @@
+"""
+Pool de processos com navegadores headless para extrair várias operadoras do Pentaho em paralelo
+"""
+
+import logging
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait as aguardar_conexoes
+
+import pandas as pd
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .esquemas import coluna_constante, concatenar
+from .extract_pentaho import MAX_MEMBROS_FILTRO, ExtratorPentaho, OperadorasNaoEncontradas
+from .extract_pentaho_rest import dividir_em_blocos
+from .metricas import METRICAS
+from .sessao_navegador import bloquear_recursos
+
+
+def _trabalhador(indice: int, conexao, nome_logger: str, nivel_log: int):
+    """
+    Processo do pool: prepara um Chrome headless uma única vez e processa os blocos recebidos
+
+    Recebe (bloco, tentativa) pela conexão (None encerra) e responde (evento, conteúdo), com evento
+    "ok" (DataFrame), "vazio" (operadoras não encontradas) ou "erro" (texto do erro).
+    Após um erro o driver é descartado e o próximo bloco usa um navegador novo.
+    """
+    logging.basicConfig(level=nivel_log, format=f"%(asctime)s - trabalhador {indice} - %(levelname)s - %(message)s")
+    logger = logging.getLogger(f"{nome_logger}.pool{indice}")
+    extrator = ExtratorPentaho(logger, headless=True)
+    driver = wait = cubo = None
+
+    try:
+        while True:
+            tarefa = conexao.recv()
+            if tarefa is None:
+                return
+            bloco, _ = tarefa
+
+            try:
+                if driver is None:
+                    driver = extrator.configurar_driver()
+                    bloquear_recursos(driver)
+                    wait = WebDriverWait(driver, 10)
+                    cubo = extrator.preparar_consulta(driver, wait)
+
+                try:
+                    extrator.clicar_operadoras(driver, wait, bloco)
+                except OperadorasNaoEncontradas:
+                    conexao.send(("vazio", None))
+                    continue
+
+                df = extrator.executar_consulta_e_obter_dados(driver, 600)
+                df["Cubo"] = coluna_constante(cubo, len(df))
+                conexao.send(("ok", df))
+
+            except Exception as e:
+                conexao.send(("erro", f"{type(e).__name__}: {e}"))
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                driver = None
+    finally:
+        if driver is not None:
+            driver.quit()
+
+
+class PoolPentaho:
+    """
+    Distribui operadoras entre N processos, cada um com o próprio Chrome headless já preparado
+    (cubo, medidas e dimensões montados uma vez)
+
+    Processos isolam falhas do Chrome: um processo encerrado é substituído e o bloco que ele
+    processava volta para a fila, assim como blocos com erro, até `max_tentativas`.
+
+    Exemplo:
+        df = PoolPentaho(logger, processos=4).df_vidas_operadora(codigos)
+    """
+
+    def __init__(self, logger: logging.Logger, processos: int = 4, max_tentativas: int = 2):
+        """
+        Args:
+            logger: Logger da aplicação
+            processos: Quantidade de navegadores em paralelo
+            max_tentativas: Tentativas por bloco de operadoras (cada nova tentativa usa um navegador novo)
+        """
+        self.logger = logger
+        self.processos = max(1, int(processos))
+        self.max_tentativas = max(1, int(max_tentativas))
+        self._contexto = multiprocessing.get_context("spawn")
+
+    def _iniciar_processo(self, indice: int):
+        """Inicia um processo do pool e retorna (processo, conexão do lado do pai)"""
+        conexao, conexao_filho = self._contexto.Pipe()
+        processo = self._contexto.Process(
+            target=_trabalhador,
+            args=(indice, conexao_filho, self.logger.name, self.logger.getEffectiveLevel()),
+            name=f"pentaho-{indice}",
+            daemon=True,
+        )
+        processo.start()
+        conexao_filho.close()
+        return processo, conexao
+
+    def df_vidas_operadora(
+        self, operadoras: list[str], consulta_unica: bool = False, max_membros: int = MAX_MEMBROS_FILTRO
+    ) -> pd.DataFrame:
+        """
+        Extrai a tabela de vidas das operadoras distribuindo os blocos entre os processos
+
+        Cada processo recebe um bloco por vez; o próximo bloco da fila é enviado ao primeiro
+        processo que terminar.
+
+        Args:
+            operadoras: Códigos de Registro ANS
+            consulta_unica: True agrupa até `max_membros` operadoras por consulta (ver ExtratorPentaho)
+            max_membros: Tamanho máximo do bloco no modo de consulta única
+
+        Returns:
+            DataFrame combinado, no mesmo formato de `ExtratorPentaho.df_vidas_operadora`
+        """
+        fila = deque((bloco, 1) for bloco in dividir_em_blocos(operadoras, max_membros if consulta_unica else 1))
+        if not fila:
+            return pd.DataFrame()
+
+        quantidade = min(self.processos, len(fila))
+        trabalhadores = {indice: self._iniciar_processo(indice) for indice in range(quantidade)}
+        em_andamento: dict[int, tuple[list[str], int]] = {}
+        encerrando: set[int] = set()  # Pipe quebrado: processo aguarda o sentinel para ser substituído
+        substituicoes = 0
+        dfs = []
+        inicio = time.perf_counter()
+
+        def repetir(tarefa: tuple[list[str], int], motivo: str):
+            bloco, tentativa = tarefa
+            METRICAS.incrementar("hermes_pentaho_erros_total", 1, "Falhas por etapa", etapa="pool")
+            if tentativa < self.max_tentativas:
+                self.logger.warning("🔁 Operadoras %s: %s - nova tentativa em navegador novo", bloco, motivo)
+                fila.append((bloco, tentativa + 1))
+            else:
+                self.logger.error("❌ Operadoras %s: %s - tentativas esgotadas", bloco, motivo)
+
+        try:
+            while fila or em_andamento:
+                # Envia um bloco a cada processo ocioso
+                for indice, (_, conexao) in trabalhadores.items():
+                    if fila and indice not in em_andamento and indice not in encerrando:
+                        tarefa = fila.popleft()
+                        try:
+                            conexao.send(tarefa)
+                        except OSError as e:  # BrokenPipeError: processo morreu antes do sentinel ser visto
+                            self.logger.warning("⚠️ Processo %s indisponível (%s): bloco devolvido à fila", indice, e)
+                            fila.appendleft(tarefa)  # Não chegou a ser executado: não conta como tentativa
+                            encerrando.add(indice)
+                            continue
+                        em_andamento[indice] = tarefa
+
+                por_objeto = {}
+                for indice, (processo, conexao) in trabalhadores.items():
+                    if indice not in encerrando:
+                        por_objeto[conexao] = indice
+                    por_objeto[processo.sentinel] = indice
+
+                for pronto in aguardar_conexoes(list(por_objeto)):
+                    indice = por_objeto[pronto]
+                    processo, conexao = trabalhadores[indice]
+                    if pronto is conexao and conexao.poll():
+                        try:
+                            evento, conteudo = conexao.recv()
+                        except EOFError:
+                            continue  # Processo encerrado: tratado pelo sentinel
+                        bloco, _ = tarefa = em_andamento.pop(indice)
+                        if evento == "erro":
+                            repetir(tarefa, conteudo)
+                        elif evento == "ok":
+                            self.logger.info("✅ Operadora %s processada com sucesso! (processo %s)", bloco, indice)
+                            dfs.append(conteudo)
+                        else:
+                            self.logger.warning("⚠️ Nenhum dado retornado para operadora %s", bloco)
+                            METRICAS.incrementar(
+                                "hermes_pentaho_erros_total", 1, "Falhas por etapa", etapa="operadora"
+                            )
+
+                    elif pronto is processo.sentinel and not processo.is_alive():
+                        # Processo encerrado sem responder (ex: Chrome derrubou o processo): substitui e refaz o bloco
+                        if indice in em_andamento:
+                            repetir(em_andamento.pop(indice), f"processo encerrado ({processo.exitcode})")
+                        conexao.close()
+                        encerrando.discard(indice)
+                        substituicoes += 1
+                        if substituicoes > self.processos * self.max_tentativas:
+                            raise RuntimeError("Processos do pool encerrando repetidamente; extração interrompida")
+                        if fila:
+                            trabalhadores[indice] = self._iniciar_processo(indice)
+                        else:
+                            del trabalhadores[indice]
+                        break  # Mapa de objetos mudou: aguarda novamente
+
+        finally:
+            for processo, conexao in trabalhadores.values():
+                try:
+                    conexao.send(None)
+                except (OSError, ValueError):
+                    pass
+            for processo, conexao in trabalhadores.values():
+                processo.join(timeout=30)
+                if processo.is_alive():
+                    processo.terminate()
+                conexao.close()
+            METRICAS.observar(
+                "hermes_pentaho_pool_segundos", time.perf_counter() - inicio, "Duração da extração pelo pool"
+            )
+            METRICAS.gravar_arquivo()
+
+        return concatenar(dfs).drop_duplicates(ignore_index=True) if dfs else pd.DataFrame()
@@ -0,0 +1,179 @@
+"""
+Sessão HTTP reutilizável com pool de conexões, keep-alive e retentativas
+"""
+
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .limitador import LimitadorAdaptativo, segundos_retry_after
+
+
+class SessaoHTTP:
+    """
+    Sessão HTTP de longa duração compartilhada entre as requisições de um extrator
+
+    * Reaproveita conexões TCP/TLS (keep-alive) através de um pool por host
+    * Repete automaticamente requisições com falha transitória (5xx, 429, conexão perdida)
+      com backoff exponencial e jitter
+    * Expõe estatísticas do pool (taxa de reuso, retentativas, falhas)
+    * Opcionalmente passa cada tentativa por um limitador adaptativo (concorrência e taxa)
+    """
+
+    STATUS_RETENTAVEIS = frozenset({429, 500, 502, 503, 504})
+    """Códigos HTTP considerados transitórios"""
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        headers: dict | None = None,
+        pool_connections: int = 4,
+        pool_maxsize: int = 8,
+        max_tentativas: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 10,
+        limitador: LimitadorAdaptativo | None = None,
+    ):
+        """
+        Args:
+            logger: Logger da aplicação
+            headers: Headers fixos enviados em todas as requisições
+            pool_connections: Quantidade de hosts distintos mantidos no pool
+            pool_maxsize: Máximo de conexões abertas por host
+            max_tentativas: Total de tentativas por requisição (1 = sem retentativa)
+            backoff_base: Espera (s) antes da primeira retentativa, dobrada a cada nova tentativa
+            backoff_max: Espera máxima (s) entre tentativas
+            timeout: Timeout (s) de cada tentativa
+            limitador: Limitador compartilhado (ex: entre todos os extratores do mesmo endpoint)
+        """
+        self.logger = logger
+        self.max_tentativas = max(1, int(max_tentativas))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limitador = limitador
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        # pool_block=True: threads excedentes aguardam uma conexão livre em vez de abrir conexões descartáveis
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._retentativas = 0
+        self._falhas = 0
+
+    def post(self, url: str, json=None, **kwargs) -> requests.Response:
+        """Executa um POST com retentativa transparente (ver `requisitar`)"""
+        return self.requisitar("POST", url, json=json, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Executa um GET com retentativa transparente (ver `requisitar`)"""
+        return self.requisitar("GET", url, **kwargs)
+
+    def requisitar(self, metodo: str, url: str, **kwargs) -> requests.Response:
+        """
+        Executa uma requisição com retentativa transparente
+
+        Returns:
+            Resposta da última tentativa (pode ter status de erro se as tentativas se esgotaram)
+
+        Raises:
+            requests.RequestException: Se todas as tentativas falharem por erro de conexão
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        for tentativa in range(1, self.max_tentativas + 1):
+            resposta = None
+            try:
+                resposta = self._enviar(metodo, url, **kwargs)
+                if resposta.status_code not in self.STATUS_RETENTAVEIS:
+                    return resposta
+                motivo = f"HTTP {resposta.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if tentativa == self.max_tentativas:
+                    self._registrar_falha()
+                    raise
+                motivo = type(e).__name__
+
+            if tentativa == self.max_tentativas:
+                break
+
+            espera = self._calcular_espera(tentativa, resposta)
+            with self._lock:
+                self._retentativas += 1
+            self.logger.warning(
+                "🔁 %s - nova tentativa %s/%s em %.1fs", motivo, tentativa + 1, self.max_tentativas, espera
+            )
+            time.sleep(espera)
+
+        self._registrar_falha()
+        return resposta
+
+    def _enviar(self, metodo: str, url: str, **kwargs) -> requests.Response:
+        """Uma tentativa, passando pelo limitador (quando configurado)"""
+        if self.limitador is None:
+            return self.session.request(metodo, url, **kwargs)
+
+        inicio = self.limitador.adquirir()
+        try:
+            resposta = self.session.request(metodo, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.limitador.liberar(inicio, falha=True)
+            raise
+        except BaseException:
+            self.limitador.liberar(inicio)
+            raise
+        self.limitador.liberar(inicio, resposta.status_code, resposta.headers.get("Retry-After"))
+        return resposta
+
+    def _calcular_espera(self, tentativa: int, resposta: requests.Response | None) -> float:
+        """Backoff exponencial com jitter, respeitando o header Retry-After quando presente"""
+        if resposta is not None:
+            retry_after = segundos_retry_after(resposta.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+
+        espera = min(self.backoff_base * 2 ** (tentativa - 1), self.backoff_max)
+        return espera * random.uniform(0.5, 1.0)
+
+    def _registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+
+    def estatisticas(self) -> dict:
+        """
+        Estatísticas acumuladas do pool de conexões
+
+        Returns:
+            dict com requisicoes, conexoes_abertas, taxa_reuso, retentativas e falhas
+        """
+        requisicoes = 0
+        conexoes = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for chave in pools.keys():
+                pool = pools[chave]
+                requisicoes += pool.num_requests
+                conexoes += pool.num_connections
+
+        with self._lock:
+            return {
+                "requisicoes": requisicoes,
+                "conexoes_abertas": conexoes,
+                "taxa_reuso": round(1 - conexoes / requisicoes, 4) if requisicoes else 0.0,
+                "retentativas": self._retentativas,
+                "falhas": self._falhas,
+            }
+
+    def fechar(self):
+        """Fecha todas as conexões do pool"""
+        self.session.close()
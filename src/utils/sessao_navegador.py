@@ -0,0 +1,185 @@
+"""
+Sessão de navegador headless de longa duração para execuções agendadas do Pentaho
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .extract_pentaho import ExtratorPentaho
+from .metricas import METRICAS
+
+PADROES_BLOQUEADOS = [
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.svg",
+    "*.ico",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.eot",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*hotjar.com*",
+]
+"""URLs bloqueadas no navegador (imagens, fontes e analytics não afetam a tabela do Saiku)"""
+
+
+def bloquear_recursos(driver, padroes: list[str] = PADROES_BLOQUEADOS):
+    """Bloqueia as URLs dos padrões via Chrome DevTools Protocol (Network.setBlockedURLs)"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+
+
+class SessaoNavegador:
+    """
+    Mantém um Chrome headless com o Saiku já preparado (cubo, medidas e dimensões) entre execuções
+
+    * Verifica a saúde do driver antes de cada uso e o recria se a sessão caiu
+    * Recicla o navegador após `max_usos` execuções ou `max_idade` segundos (limita vazamento de memória)
+    * Bloqueia imagens, fontes e analytics para reduzir o peso das páginas
+
+    Exemplo:
+        sessao = SessaoNavegador(logger)
+        ExtratorPentaho(logger, sessao=sessao).df_vidas_operadora(codigos)  # aquece
+        ExtratorPentaho(logger, sessao=sessao).df_vidas_operadora(codigos)  # reaproveita
+        sessao.fechar()
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        headless: bool = True,
+        max_usos: int = 20,
+        max_idade: float = 2 * 3600,
+        padroes_bloqueados: list[str] | None = PADROES_BLOQUEADOS,
+    ):
+        """
+        Args:
+            logger: Logger da aplicação
+            headless: False abre o Chrome com janela (depuração)
+            max_usos: Execuções antes de reciclar o navegador
+            max_idade: Idade máxima (s) do navegador antes de reciclar
+            padroes_bloqueados: Padrões de URL bloqueados (None desativa o bloqueio)
+        """
+        self.logger = logger
+        self.max_usos = max(1, int(max_usos))
+        self.max_idade = max_idade
+        self.padroes_bloqueados = padroes_bloqueados
+        self._extrator = ExtratorPentaho(logger, headless=headless)
+        self._lock = threading.RLock()
+        self.driver = None
+        self.wait = None
+        self.cubo = None
+        self._criado_em = 0.0
+        self._usos = 0
+
+    def saudavel(self) -> bool:
+        """True se o driver responde e a página do Saiku continua carregada"""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return document.readyState") == "complete"
+        except WebDriverException:
+            return False
+
+    def _abrir(self):
+        inicio = time.perf_counter()
+        self.driver = self._extrator.configurar_driver()
+        try:
+            if self.padroes_bloqueados:
+                bloquear_recursos(self.driver, self.padroes_bloqueados)
+            self.wait = WebDriverWait(self.driver, 10)
+            self.cubo = self._extrator.preparar_consulta(self.driver, self.wait)
+        except Exception:
+            self._encerrar()
+            raise
+        self._criado_em = time.monotonic()
+        self._usos = 0
+        METRICAS.observar(
+            "hermes_pentaho_sessao_aquecimento_segundos",
+            time.perf_counter() - inicio,
+            "Tempo para abrir e preparar o navegador",
+        )
+        self.logger.info("🌐 Navegador preparado (cubo %s)", self.cubo)
+
+    def _encerrar(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+        self.driver = self.wait = self.cubo = None
+
+    def reciclar(self, motivo: str = "manual"):
+        """Encerra o navegador atual e abre um novo já preparado"""
+        with self._lock:
+            self.logger.info("♻️ Reciclando navegador: %s", motivo)
+            METRICAS.incrementar("hermes_pentaho_sessao_reciclagens_total", 1, "Navegadores recriados", motivo=motivo)
+            self._encerrar()
+            self._abrir()
+            return self.driver, self.wait, self.cubo
+
+    def recuperar(self):
+        """Recria o navegador se a sessão caiu durante o uso; retorna (driver, wait, cubo)"""
+        with self._lock:
+            if not self.saudavel():
+                return self.reciclar("sessao_invalida")
+            return self.driver, self.wait, self.cubo
+
+    @contextmanager
+    def usar(self):
+        """
+        Reserva o navegador para uma execução
+
+        Yields:
+            (driver, wait, cubo) prontos para filtrar operadoras e executar consultas
+        """
+        with self._lock:
+            if self.driver is None:
+                self._abrir()
+            elif not self.saudavel():
+                self.reciclar("sessao_invalida")
+            elif self._usos >= self.max_usos:
+                self.reciclar("max_usos")
+            elif time.monotonic() - self._criado_em >= self.max_idade:
+                self.reciclar("max_idade")
+
+            self._usos += 1
+            try:
+                yield self.driver, self.wait, self.cubo
+            except WebDriverException:
+                # Falha do navegador: a próxima execução começa com um driver novo
+                self._encerrar()
+                raise
+
+    def fechar(self, aguardar: bool = True):
+        """
+        Encerra o navegador
+
+        Args:
+            aguardar: False não espera a execução que está usando o navegador (encerramento do serviço);
+                o navegador é fechado mesmo assim e a execução falha no próximo comando
+        """
+        if self._lock.acquire(blocking=aguardar):
+            try:
+                self._encerrar()
+            finally:
+                self._lock.release()
+            return
+        self.logger.info("🛑 Navegador em uso: encerrando sem aguardar a execução atual")
+        self._encerrar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
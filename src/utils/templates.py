@@ -0,0 +1,106 @@
+"""
+Templates de payload JSON compilados uma única vez
+"""
+
+import json
+import re
+from pathlib import Path
+
+PADRAO_SLOT = re.compile(r"\{\{(\w+)\}\}")
+"""Marcador de parâmetro no template (ex: {{ANO}})"""
+
+
+def substituir(estrutura, caminho: tuple, valor):
+    """
+    Retorna uma cópia de `estrutura` com `valor` no `caminho`, copiando apenas os contêineres do caminho
+
+    O restante da estrutura é compartilhado com o original, que não é modificado.
+
+    Args:
+        estrutura: dict/list de origem
+        caminho: Sequência de chaves/índices até o nó a substituir
+        valor: Novo valor do nó
+    """
+    if not caminho:
+        return valor
+    copia = estrutura.copy()
+    chave = caminho[0]
+    copia[chave] = substituir(estrutura[chave], caminho[1:], valor)
+    return copia
+
+
+class TemplatePayload:
+    """
+    Template de payload com os slots `{{NOME}}` localizados na carga
+
+    O JSON é lido e interpretado uma única vez; cada payload é gerado preenchendo apenas os
+    nós de texto que contêm slots. Os valores são inseridos na estrutura (não no texto JSON),
+    então aspas ou `{{` nos parâmetros não corrompem o payload.
+    """
+
+    def __init__(self, estrutura):
+        """
+        Args:
+            estrutura: JSON já interpretado (dict/list) contendo slots `{{NOME}}` em valores de texto
+        """
+        self.estrutura = estrutura
+        # Árvore com apenas os caminhos que levam a slots; as folhas são as partes do texto a preencher
+        self._arvore: dict = {}
+        self.slots: set[str] = set()
+        self._mapear(estrutura, self._arvore, None)
+
+    @classmethod
+    def carregar(cls, caminho: str | Path) -> "TemplatePayload":
+        """Lê e compila um template a partir de um arquivo JSON"""
+        with open(caminho, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _mapear(self, no, arvore: dict, chave) -> bool:
+        itens = no.items() if isinstance(no, dict) else enumerate(no) if isinstance(no, list) else None
+        if itens is None:
+            if isinstance(no, str) and PADRAO_SLOT.search(no):
+                # "'{{MES}}'" -> ["'", ("MES",), "'"]
+                partes = [(parte,) if i % 2 else parte for i, parte in enumerate(PADRAO_SLOT.split(no)) if parte]
+                self.slots.update(parte[0] for parte in partes if isinstance(parte, tuple))
+                arvore[chave] = partes
+                return True
+            return False
+
+        subarvore: dict = {}
+        for filho_chave, filho in itens:
+            self._mapear(filho, subarvore, filho_chave)
+        if subarvore:
+            if chave is None:
+                arvore.update(subarvore)
+            else:
+                arvore[chave] = subarvore
+        return bool(subarvore)
+
+    def preencher(self, **valores) -> dict:
+        """
+        Gera um payload com os slots preenchidos
+
+        Args:
+            **valores: Valor de cada slot (ex: ANO="2025", MES="jan")
+
+        Returns:
+            dict: Payload pronto para requisição (nós sem slots são compartilhados com o template)
+
+        Raises:
+            KeyError: Se algum slot do template não foi informado
+        """
+        faltando = self.slots.difference(valores)
+        if faltando:
+            raise KeyError(f"Slots não informados: {sorted(faltando)}")
+        if not self._arvore:
+            return self.estrutura
+        return self._preencher(self.estrutura, self._arvore, valores)
+
+    def _preencher(self, no, arvore: dict, valores: dict):
+        copia = no.copy()
+        for chave, sub in arvore.items():
+            if isinstance(sub, dict):
+                copia[chave] = self._preencher(no[chave], sub, valores)
+            else:
+                copia[chave] = "".join(str(valores[parte[0]]) if isinstance(parte, tuple) else parte for parte in sub)
+        return copia
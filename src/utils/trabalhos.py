@@ -0,0 +1,143 @@
+"""
+Trabalhos em segundo plano (threads) com progresso, cancelamento e resultado compartilhado
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+CANCELADO = "cancelado"
+ERRO = "erro"
+
+
+class Trabalho:
+    """
+    Extração executada em uma thread própria
+
+    A função recebe o próprio trabalho para informar o progresso (`atualizar`, compatível com o
+    parâmetro `progresso` dos extratores) e consultar o cancelamento (`cancelar`, um threading.Event).
+    """
+
+    def __init__(self, chave: tuple, descricao: str, funcao: Callable[["Trabalho"], object], logger: logging.Logger):
+        self.logger = logger
+        self.chave = chave
+        self.descricao = descricao
+        self.funcao = funcao
+        self.status = EXECUTANDO
+        self.concluidas = 0
+        self.total = 0
+        self.linhas = 0
+        self.resultado = None
+        self.erro: str | None = None
+        self.iniciado_em = time.time()
+        self.concluido_em: float | None = None
+        self.cancelar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name=f"trabalho-{descricao}", daemon=True)
+
+    def _executar(self):
+        try:
+            resultado = self.funcao(self)
+            if self.cancelar.is_set():
+                self.status = CANCELADO
+            else:
+                self.resultado = resultado
+                self.status = CONCLUIDO
+        except Exception as e:
+            self.erro = f"{type(e).__name__}: {e}"
+            self.status = ERRO
+            self.logger.error("❌ Trabalho %s falhou: %s", self.descricao, e, exc_info=True)
+        finally:
+            self.concluido_em = time.time()
+        self.logger.info(
+            "⏹️ Trabalho %s: %s em %.1fs (%s linhas)", self.descricao, self.status, self.duracao, self.linhas
+        )
+
+    def atualizar(self, concluidas: int, total: int, linhas: int):
+        """Registra o progresso (unidades concluídas, total de unidades, linhas até agora)"""
+        self.concluidas, self.total, self.linhas = concluidas, total, linhas
+
+    @property
+    def ativo(self) -> bool:
+        return self.status == EXECUTANDO
+
+    @property
+    def fracao(self) -> float:
+        """Fração concluída (0 a 1)"""
+        return min(1.0, self.concluidas / self.total) if self.total else 0.0
+
+    @property
+    def duracao(self) -> float:
+        return (self.concluido_em or time.time()) - self.iniciado_em
+
+
+class GerenciadorTrabalhos:
+    """
+    Registro de trabalhos do processo, compartilhado entre sessões (ex: via st.cache_resource)
+
+    * Um trabalho é identificado por uma chave (ex: ("IGR", data de atualização)); pedidos com a
+      mesma chave reaproveitam o trabalho em andamento ou o resultado já concluído
+    * Trabalhos cancelados ou com erro são refeitos no próximo pedido
+    * Mantém os `max_concluidos` resultados mais recentes
+
+    Exemplo:
+        trabalho = gerenciador.iniciar(("IGR", data), "IGR", extrair)
+        trabalho.fracao, trabalho.linhas  # progresso
+        trabalho.cancelar.set()           # cancelamento
+    """
+
+    def __init__(self, logger: logging.Logger, max_concluidos: int = 8):
+        """
+        Args:
+            logger: Logger da aplicação
+            max_concluidos: Quantidade de trabalhos concluídos mantidos (com seus resultados)
+        """
+        self.logger = logger
+        self.max_concluidos = max(1, int(max_concluidos))
+        self._lock = threading.Lock()
+        self._trabalhos: OrderedDict[tuple, Trabalho] = OrderedDict()
+
+    def obter(self, chave: tuple) -> Trabalho | None:
+        with self._lock:
+            return self._trabalhos.get(chave)
+
+    def iniciar(self, chave: tuple, descricao: str, funcao: Callable[[Trabalho], object]) -> Trabalho:
+        """
+        Inicia o trabalho da chave, ou retorna o existente se estiver em andamento ou concluído
+
+        Args:
+            chave: Identificador do resultado (inclua a data de atualização dos dados)
+            descricao: Nome exibido nos logs
+            funcao: Função executada na thread, recebe o Trabalho e retorna o resultado
+        """
+        with self._lock:
+            existente = self._trabalhos.get(chave)
+            if existente is not None and existente.status in (EXECUTANDO, CONCLUIDO):
+                self._trabalhos.move_to_end(chave)
+                return existente
+
+            trabalho = Trabalho(chave, descricao, funcao, self.logger)
+            self._trabalhos[chave] = trabalho
+            self._descartar_antigos()
+
+        self.logger.info("▶️ Trabalho %s iniciado em segundo plano", descricao)
+        trabalho._thread.start()
+        return trabalho
+
+    def _descartar_antigos(self):
+        """Remove os trabalhos finalizados mais antigos além de `max_concluidos` (chamar com o lock)"""
+        finalizados = [chave for chave, trabalho in self._trabalhos.items() if not trabalho.ativo]
+        for chave in finalizados[: max(0, len(finalizados) - self.max_concluidos)]:
+            del self._trabalhos[chave]
+
+    def cancelar(self, chave: tuple) -> bool:
+        """Sinaliza o cancelamento do trabalho da chave; True se havia um trabalho em andamento"""
+        trabalho = self.obter(chave)
+        if trabalho is None or not trabalho.ativo:
+            return False
+        trabalho.cancelar.set()
+        self.logger.info("⏹️ Cancelamento solicitado: %s", trabalho.descricao)
+        return True
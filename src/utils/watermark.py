@@ -0,0 +1,69 @@
+"""
+Watermark persistido da última sincronização de cada fonte de dados
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+class Watermark:
+    """
+    Guarda, por fonte (ex: "IGR"), a data de atualização do relatório já sincronizada e o
+    último período (ano, mês) efetivamente extraído
+
+    O estado é um arquivo JSON gravado de forma atômica (arquivo temporário + os.replace),
+    então uma interrupção durante a gravação nunca deixa o watermark corrompido.
+    """
+
+    def __init__(self, caminho: str | Path = Path("state") / "watermark.json"):
+        """
+        Args:
+            caminho: Arquivo JSON onde o watermark é persistido
+        """
+        self.caminho = Path(caminho)
+
+    def _carregar(self) -> dict:
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def ler(self, fonte: str) -> str | None:
+        """
+        Returns:
+            Data de atualização sincronizada da fonte ou None se nunca sincronizada
+        """
+        return self._carregar().get(fonte, {}).get("data_atualizacao")
+
+    def ler_periodo(self, fonte: str) -> tuple[str, str] | None:
+        """
+        Returns:
+            Último (ano, mês) sincronizado da fonte ou None se desconhecido (watermark antigo ou ausente)
+        """
+        periodo = self._carregar().get(fonte, {}).get("ultimo_periodo")
+        return tuple(periodo) if periodo else None
+
+    def gravar(self, fonte: str, data_atualizacao: str, ultimo_periodo: tuple[str, str] | None = None):
+        """
+        Registra a data de atualização da fonte como sincronizada
+
+        Args:
+            fonte: Nome da fonte (ex: "IGR")
+            data_atualizacao: Data de atualização do relatório (dd/mm/aaaa)
+            ultimo_periodo: Último (ano, mês) extraído na sincronização
+        """
+        estado = self._carregar()
+        estado[fonte] = {
+            "data_atualizacao": data_atualizacao,
+            "ultimo_periodo": None if ultimo_periodo is None else list(ultimo_periodo),
+            "sincronizado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho)
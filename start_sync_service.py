@@ -1,21 +1,26 @@
 """
-Script principal para sincronização de dados Salesforce para Data Lake Oracle
-
-Executa sincronização de hora em hora das tabelas configuradas
+Serviço de sincronização agendada dos dados da ANS (Power BI e Pentaho)
+
+Tarefas (configuráveis no env/credentials.env):
+* data_pbi: verifica a data de atualização do Power BI (SYNC_INTERVAL_MINUTES, padrão 10) e,
+  se mudou, antecipa a sincronização do IGR
+* igr: sincroniza a grade do IGR (SYNC_IGR_CRON, padrão "0 7 * * *")
+* pentaho: extrai as vidas das operadoras de PENTAHO_OPERADORAS (SYNC_PENTAHO_CRON, padrão "0 3 * * *");
+  desativada se PENTAHO_OPERADORAS estiver vazio
 """
 
 import os
 import sys
-import time
 from pathlib import Path
 
-import schedule
 from dotenv import load_dotenv
-from src.run_sync import run_sync
+from src.run_sync import run_sync, run_sync_pentaho, verificar_atualizacao
+from src.utils.agendador import Agendador, Tarefa
 from src.utils.logger import MeuLogger
+from src.utils.sessao_navegador import SessaoNavegador
 
 # Configura logger
-logger = MeuLogger.setup_logger()
+logger = MeuLogger.setup_logger("logs")
 
 # Carrega o arquivo .env da pasta env/
 env_path = Path("env/credentials.env")
@@ -23,31 +28,47 @@ load_dotenv(env_path)
 
 
 def start_sync_service():
-    """Função principal - executa sincronização em modo agendado"""
+    """Função principal - executa as sincronizações em modo agendado até Ctrl+C"""
+    sessao = None
     try:
-        # Intervalo de sincronização (em minutos)
-        sync_interval = int(os.getenv("SYNC_INTERVAL_MINUTES", "10"))
+        jitter = float(os.getenv("SYNC_JITTER_SECONDS", "30"))
+        operadoras = [codigo.strip() for codigo in os.getenv("PENTAHO_OPERADORAS", "").split(",") if codigo.strip()]
+
+        tarefas = [
+            Tarefa(
+                "data_pbi",
+                lambda: verificar_atualizacao(logger) and agendador.antecipar("igr"),
+                intervalo=int(os.getenv("SYNC_INTERVAL_MINUTES", "10")) * 60,
+                jitter=jitter,
+                executar_ao_iniciar=True,
+            ),
+            Tarefa("igr", lambda: run_sync(logger), cron=os.getenv("SYNC_IGR_CRON", "0 7 * * *"), jitter=jitter),
+        ]
+        if operadoras:
+            # Um único navegador preparado é reaproveitado entre as execuções do Pentaho
+            sessao = SessaoNavegador(logger)
+            tarefas.append(
+                Tarefa(
+                    "pentaho",
+                    lambda: run_sync_pentaho(logger, operadoras, sessao, cancelar=agendador.cancelar),
+                    cron=os.getenv("SYNC_PENTAHO_CRON", "0 3 * * *"),
+                    jitter=jitter,
+                )
+            )
+        else:
+            logger.info("PENTAHO_OPERADORAS vazio: sincronização do Pentaho desativada")
+
+        agendador = Agendador(logger, tarefas)
 
         logger.info("%s", "=" * 80)
         logger.info("SINCRONIZAÇÃO AGENDADA INICIADA")
         logger.info("%s", "=" * 80)
-        logger.info("Intervalo de sincronização: %s minuto(s)", sync_interval)
+        for tarefa in tarefas:
+            logger.info("Tarefa %s: %s (jitter até %ss)", tarefa.nome, tarefa.descricao(), tarefa.jitter)
         logger.info("%s", "=" * 80)
-
-        # Executa primeira sincronização imediatamente
-        logger.info("Executando primeira sincronização...")
-        # run_sync(logger)
-
-        # Agenda sincronizações periódicas
-        schedule.every(sync_interval).minutes.do(run_sync, logger=logger)
-
-        logger.info("Aguardando próxima execução (a cada %s minuto(s))...", sync_interval)
         logger.info("Pressione Ctrl+C para interromper")
 
-        # Loop principal
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Verifica a cada minuto
+        agendador.executar()
 
     except KeyboardInterrupt:
         logger.info("\n\nSincronização interrompida pelo usuário")
@@ -57,6 +78,11 @@ def start_sync_service():
         logger.error("Erro fatal: %s", error, exc_info=True)
         sys.exit(1)
 
+    finally:
+        if sessao is not None:
+            # Não aguarda a extração em andamento (que mantém o navegador reservado)
+            sessao.fechar(aguardar=False)
+
 
-if __name__ == "__start_sync_service__":
+if __name__ == "__main__":
     start_sync_service()